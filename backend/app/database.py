@@ -1,74 +1,270 @@
-import motor.motor_asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+import asyncio
 import os
-import sys
+import threading
+import time
 from dotenv import load_dotenv
 
-# Print Python version and module paths for debugging in Vercel
-print(f"Python version: {sys.version}")
-print(f"Motor version: {motor.motor_asyncio.__version__}")
+from app.jobs import JOB_QUEUE_BACKEND
+from app.log import get_logger
+from app.metrics import record_mongo_command
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 # MongoDB connection settings
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "qblog")
 
+# Connection pool settings
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "10"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# Connections opened eagerly at startup; defaults to the minimum pool size
+MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGO_WARMUP_CONNECTIONS", str(MONGO_MIN_POOL_SIZE)))
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times MongoDB commands by collection and operation.
+
+    pymongo calls listeners from Motor's worker threads, so events are only
+    handed to the metrics module, which folds them into histograms on the
+    event loop.
+    """
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(key)
+        if not isinstance(collection, str):
+            collection = "-"
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "-")
+        record_mongo_command(event.command_name, collection, event.duration_micros / 1e6, True)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "-")
+        record_mongo_command(event.command_name, collection, event.duration_micros / 1e6, False)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Tracks connection pool occupancy from pymongo's CMAP events.
+
+    Events arrive on Motor's worker threads, so the counters are guarded by
+    a lock; reads take a consistent snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            "open": 0,
+            "checked_out": 0,
+            "waiting": 0,
+            "created_total": 0,
+            "checkout_failed_total": 0,
+        }
+
+    def _add(self, **deltas) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1, checkout_failed_total=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def connection_created(self, event):
+        self._add(open=1, created_total=1)
+
+    def connection_closed(self, event):
+        self._add(open=-1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
 # Global DB client and database instances
 client = None
 db = None
 
+# Command timings and pool occupancy are recorded for /api/metrics
+command_listener = MongoCommandListener()
+pool_listener = MongoPoolListener()
+
+# Single-flight guard: concurrent callers of connect_to_mongo share one attempt
+_connect_lock = None
+_connected = False
+
+
+def _get_client():
+    """Return the process-wide client, creating it on first use.
+
+    Creating the client does no I/O, so it happens synchronously and there
+    is never more than one client (and one pool) per process.
+    """
+    global client
+    if client is None:
+        client = AsyncIOMotorClient(
+            MONGO_URI,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=[command_listener, pool_listener],
+        )
+    return client
+
+
+async def create_indexes():
+    """Create the indexes the queries rely on; safe to run repeatedly.
+    
+    Serverless deployments skip this at startup and run it through
+    ``python -m app.manage migrate`` instead.
+    """
+    database = get_database()
+    await database.users.create_index("email", unique=True)
+    await database.users.create_index("username", unique=True)
+    # Compound indexes serve the filter and the (created_at, _id) sort together
+    await database.blogs.create_index([("created_at", -1), ("_id", -1)])
+    await database.blogs.create_index([("author_id", 1), ("created_at", -1), ("_id", -1)])
+    await database.blogs.create_index([("tags", 1), ("created_at", -1), ("_id", -1)])
+    # Serves the incremental (updated_at ordered) export
+    await database.blogs.create_index([("updated_at", 1), ("_id", 1)])
+    if JOB_QUEUE_BACKEND == "mongo":
+        # Serves the workers' claim query (due pending jobs, oldest first)
+        await database.jobs.create_index([("status", 1), ("run_at", 1)])
+    logger.info("Database indexes created/verified")
+
+
+async def warm_pool(connections: int = MONGO_WARMUP_CONNECTIONS):
+    """Open connections up front so the first burst of requests skips the handshakes.
+
+    Concurrent pings each need their own connection, so the pool grows to
+    ``connections`` before any request arrives.
+    """
+    connections = min(connections, MONGO_MAX_POOL_SIZE)
+    if connections <= 0:
+        return
+    
+    started = time.perf_counter()
+    admin = _get_client().admin
+    results = await asyncio.gather(
+        *(admin.command("ping") for _ in range(connections)),
+        return_exceptions=True,
+    )
+    failed = sum(1 for result in results if isinstance(result, Exception))
+    logger.info("Warmed MongoDB connection pool", extra={"fields": {
+        "connections": connections,
+        "failed": failed,
+        "open": pool_listener.stats()["open"],
+        "seconds": round(time.perf_counter() - started, 3),
+    }})
+
+
 async def connect_to_mongo():
-    """Connect to MongoDB and initialize global client and database objects."""
-    global client, db
+    """Connect to MongoDB, create indexes and warm the pool, once per process."""
+    global db, _connect_lock, _connected
     
-    try:
-        print(f"Attempting to connect to MongoDB at {MONGO_URI.replace('//', '//****:****@')}")
-        client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-        
-        # Verify connection works
-        await client.admin.command('ping')
-        
-        db = client[DATABASE_NAME]
-        print(f"Successfully connected to MongoDB database: {DATABASE_NAME}")
+    if _connected:
+        return
+    if _connect_lock is None:
+        _connect_lock = asyncio.Lock()
+    
+    async with _connect_lock:
+        # Whoever waited on the lock reuses the connection made by the first caller
+        if _connected:
+            return
         
-        # Creating indexes for faster queries
         try:
-            await db.users.create_index("email", unique=True)
-            await db.users.create_index("username", unique=True)
-            await db.blogs.create_index("author_id")
-            await db.blogs.create_index("created_at")
-            print("Database indexes created/verified")
-        except Exception as index_error:
-            print(f"Warning - could not create indexes: {index_error}")
-            # Don't fail startup if indexes can't be created
+            logger.info("Connecting to MongoDB", extra={"fields": {"uri": MONGO_URI.replace('//', '//****:****@')}})
+            mongo_client = _get_client()
+            
+            # Verify connection works
+            await mongo_client.admin.command('ping')
+            
+            db = mongo_client[DATABASE_NAME]
+            logger.info("Connected to MongoDB", extra={"fields": {"database": DATABASE_NAME}})
+            
+            # Creating indexes for faster queries
+            try:
+                await create_indexes()
+            except Exception as index_error:
+                logger.warning(f"Could not create indexes: {index_error}")
+                # Don't fail startup if indexes can't be created
+            
+            await warm_pool()
+            _connected = True
         
-    except Exception as e:
-        print(f"Error connecting to MongoDB: {e}")
-        # In Vercel, we might want to continue even if DB connection fails initially
-        # as it might be a temporary issue
-        print("Will attempt to reconnect on first request")
+        except Exception as e:
+            logger.error(f"Error connecting to MongoDB: {e}")
+            # In Vercel, we might want to continue even if DB connection fails initially
+            # as it might be a temporary issue
+            logger.info("Will attempt to reconnect on first request")
 
 async def close_mongo_connection():
     """Close MongoDB connection."""
-    global client
+    global client, db, _connected
     if client:
         client.close()
-        print("MongoDB connection closed")
+        client = None
+        db = None
+        _connected = False
+        logger.info("MongoDB connection closed")
 
 def get_database():
-    """Return the database instance. Lazy-connects if needed."""
-    global db, client
+    """Return the database instance. Lazy-connects if needed.
+    
+    The lazy path reuses the shared client, so requests that arrive while
+    connect_to_mongo is still running don't build clients of their own.
+    """
+    global db
     
     # For Vercel serverless functions, we might need to reconnect
     if db is None and MONGO_URI:
-        import asyncio
         try:
-            print("Lazy-connecting to MongoDB...")
-            client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-            db = client[DATABASE_NAME]
-            print("Lazy-connection successful")
+            db = _get_client()[DATABASE_NAME]
         except Exception as e:
-            print(f"Error during lazy-connection to MongoDB: {e}")
+            logger.error(f"Error during lazy-connection to MongoDB: {e}")
     
-    return db 
\ No newline at end of file
+    return db
+
+
+def pool_stats() -> dict:
+    """Return connection pool occupancy and the configured limits."""
+    return {
+        **pool_listener.stats(),
+        "min_pool_size": MONGO_MIN_POOL_SIZE,
+        "max_pool_size": MONGO_MAX_POOL_SIZE,
+    }
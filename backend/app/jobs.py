@@ -0,0 +1,337 @@
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import os
+import time
+import uuid
+from dotenv import load_dotenv
+
+from app.log import get_logger
+
+load_dotenv()
+logger = get_logger(__name__)
+
+# Job queue configurations ("memory", or "mongo" for jobs that survive restarts)
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "memory").lower()
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "0.5"))
+JOB_RETRY_BACKOFF_MAX = float(os.getenv("JOB_RETRY_BACKOFF_MAX", "60"))
+JOB_DRAIN_TIMEOUT = float(os.getenv("JOB_DRAIN_TIMEOUT", "10"))
+# Durable (mongo) backend only: idle polling interval and how long a claimed job stays claimed
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+Handler = Callable[..., Awaitable[None]]
+
+# Job name -> async handler taking the payload as keyword arguments
+_handlers: Dict[str, Handler] = {}
+_stats = {"enqueued": 0, "completed": 0, "retried": 0, "failed": 0, "inline": 0}
+
+
+def job(name: str) -> Callable[[Handler], Handler]:
+    """Register an async function as the handler for jobs called ``name``.
+
+    Handlers may run more than once (after a failure, or when a durable job's
+    lease expires), so they should be safe to repeat or at least harmless.
+    """
+    def register(handler: Handler) -> Handler:
+        _handlers[name] = handler
+        return handler
+    return register
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff after the given number of failed attempts."""
+    return min(JOB_RETRY_BACKOFF_MAX, JOB_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+
+async def _execute(item: dict) -> None:
+    handler = _handlers.get(item["name"])
+    if handler is None:
+        raise LookupError(f"No handler registered for job {item['name']!r}")
+    await handler(**item["payload"])
+
+
+def _log_failure(item: dict, error: Exception, final: bool) -> None:
+    fields = {"job": item["name"], "attempts": item["attempts"], "error": str(error)}
+    if final:
+        logger.error("Job failed, giving up", extra={"fields": fields})
+    else:
+        logger.warning("Job failed, will retry", extra={"fields": fields})
+
+
+class MemoryJobQueue:
+    """Jobs held in a bounded asyncio.Queue; lost if the process dies.
+
+    Retries are put back on the queue after their backoff. The queue's
+    unfinished-task count only drops once a job has completed or given up,
+    so ``join()`` also waits for jobs that are between retries.
+    """
+
+    def __init__(self, maxsize: int = JOB_QUEUE_SIZE):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        # Retries waiting out their backoff; referenced so they aren't garbage collected
+        self._retries: Set[asyncio.Task] = set()
+
+    async def put(self, item: dict) -> None:
+        # Waits for room when full, which slows writers down instead of dropping work
+        await self._queue.put(item)
+
+    async def get(self) -> dict:
+        return await self._queue.get()
+
+    async def done(self, item: dict) -> None:
+        self._queue.task_done()
+
+    async def fail(self, item: dict) -> None:
+        self._queue.task_done()
+
+    async def retry(self, item: dict, delay: float) -> None:
+        task = asyncio.get_running_loop().create_task(self._requeue(item, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _requeue(self, item: dict, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # Put back (waiting for room if full) before the failed attempt is marked
+        # done, so the unfinished count never drops to zero and join() keeps waiting
+        try:
+            await self._queue.put(item)
+        finally:
+            self._queue.task_done()
+
+    async def drain(self) -> None:
+        await self._queue.join()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "pending": self._queue.qsize(),
+            "retrying": len(self._retries),
+            "capacity": self._queue.maxsize,
+        }
+
+
+class MongoJobQueue:
+    """Jobs stored in the ``jobs`` collection, so they survive restarts.
+
+    Workers claim a due job with one ``find_one_and_update`` that sets a
+    lease; a job whose worker died is claimed again once the lease runs
+    out. Finished jobs are deleted, jobs that used up their attempts are
+    kept with ``status: "failed"`` for inspection. Capacity is the
+    collection's, so JOB_QUEUE_SIZE does not apply.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+
+    @property
+    def collection(self):
+        from app.database import get_database
+        return get_database().jobs
+
+    async def put(self, item: dict) -> None:
+        now = datetime.utcnow()
+        await self.collection.insert_one({
+            "_id": item["id"],
+            "name": item["name"],
+            "payload": item["payload"],
+            "attempts": 0,
+            "status": "pending",
+            "run_at": now,
+            "created_at": now,
+        })
+        self._wakeup.set()
+
+    async def get(self) -> dict:
+        while True:
+            now = datetime.utcnow()
+            document = await self.collection.find_one_and_update(
+                {"$or": [
+                    {"status": "pending", "run_at": {"$lte": now}},
+                    {"status": "running", "locked_until": {"$lte": now}},
+                ]},
+                {"$set": {"status": "running", "locked_until": now + timedelta(seconds=JOB_LEASE_SECONDS)}},
+                sort=[("run_at", 1)],
+            )
+            if document is not None:
+                return {
+                    "id": document["_id"],
+                    "name": document["name"],
+                    "payload": document["payload"],
+                    "attempts": document["attempts"],
+                }
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def done(self, item: dict) -> None:
+        await self.collection.delete_one({"_id": item["id"]})
+
+    async def fail(self, item: dict) -> None:
+        await self.collection.update_one({"_id": item["id"]}, {"$set": {
+            "status": "failed",
+            "attempts": item["attempts"],
+            "error": item["error"],
+        }})
+
+    async def retry(self, item: dict, delay: float) -> None:
+        await self.collection.update_one({"_id": item["id"]}, {"$set": {
+            "status": "pending",
+            "attempts": item["attempts"],
+            "error": item.get("error"),
+            "run_at": datetime.utcnow() + timedelta(seconds=delay),
+        }})
+
+    async def drain(self) -> None:
+        # Wait for jobs due now; retries scheduled for later stay stored for the next process
+        while await self.collection.find_one(
+            {"status": "pending", "run_at": {"$lte": datetime.utcnow()}}, {"_id": 1}
+        ):
+            await asyncio.sleep(0.1)
+
+    def stats(self) -> dict:
+        return {"backend": "mongo"}
+
+
+_queue = None
+_workers: List[asyncio.Task] = []
+_in_flight = 0
+_idle: Optional[asyncio.Event] = None
+
+
+def get_job_queue():
+    """Return the configured job queue, created on first use."""
+    global _queue
+    if _queue is None:
+        if JOB_QUEUE_BACKEND == "mongo":
+            _queue = MongoJobQueue()
+        elif JOB_QUEUE_BACKEND == "memory":
+            _queue = MemoryJobQueue()
+        else:
+            raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {JOB_QUEUE_BACKEND}")
+    return _queue
+
+
+async def _process(queue, item: dict) -> None:
+    global _in_flight
+    _in_flight += 1
+    _idle.clear()
+    try:
+        await _execute(item)
+    except Exception as e:
+        item["attempts"] += 1
+        item["error"] = str(e)
+        final = item["attempts"] >= JOB_MAX_ATTEMPTS
+        _log_failure(item, e, final)
+        if final:
+            _stats["failed"] += 1
+            await queue.fail(item)
+        else:
+            _stats["retried"] += 1
+            await queue.retry(item, retry_delay(item["attempts"]))
+    else:
+        _stats["completed"] += 1
+        await queue.done(item)
+    finally:
+        _in_flight -= 1
+        if not _in_flight:
+            _idle.set()
+
+
+async def _worker(queue) -> None:
+    while True:
+        try:
+            item = await queue.get()
+        except Exception:
+            # Storage hiccup while claiming a durable job; back off and poll again
+            logger.exception("Could not fetch a job")
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            continue
+        # Shielded so a drain that times out doesn't cut a job off halfway through a write
+        await asyncio.shield(_process(queue, item))
+
+
+def start_job_workers(workers: int = JOB_WORKERS) -> None:
+    """Start the worker tasks on the running loop (idempotent).
+
+    Until this is called (serverless mode, management commands), ``enqueue``
+    runs jobs inline instead, since nothing would be left to process them.
+    """
+    global _idle
+    if _workers or workers <= 0:
+        return
+    _idle = asyncio.Event()
+    _idle.set()
+    queue = get_job_queue()
+    loop = asyncio.get_running_loop()
+    _workers.extend(loop.create_task(_worker(queue)) for _ in range(workers))
+    logger.info("Job workers started", extra={"fields": {"backend": JOB_QUEUE_BACKEND, "workers": workers}})
+
+
+async def enqueue(name: str, **payload) -> None:
+    """Schedule ``name`` to run after the current request with ``payload``.
+
+    The payload must be JSON/BSON friendly for the durable backend. When
+    the queue is full this waits for room. Without running workers the job
+    runs right away, once, and a failure is logged rather than raised.
+    """
+    if name not in _handlers:
+        raise LookupError(f"No handler registered for job {name!r}")
+    item = {"id": uuid.uuid4().hex, "name": name, "payload": payload, "attempts": 0}
+
+    if not _workers:
+        _stats["inline"] += 1
+        try:
+            await _execute(item)
+        except Exception as e:
+            item["attempts"] = 1
+            _log_failure(item, e, final=True)
+            _stats["failed"] += 1
+        return
+
+    await get_job_queue().put(item)
+    _stats["enqueued"] += 1
+
+
+async def drain_jobs(timeout: float = JOB_DRAIN_TIMEOUT) -> None:
+    """Wait up to ``timeout`` seconds for queued jobs, then stop the workers.
+
+    Called on shutdown. In-memory jobs still queued after the timeout are
+    lost (and logged); durable jobs stay stored for the next start.
+    """
+    global _queue
+    if not _workers:
+        return
+    queue = get_job_queue()
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.gather(queue.drain(), _idle.wait()), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Job queue not drained before shutdown", extra={"fields": queue.stats()})
+
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    # Let an in-flight job finish its current write, up to whatever time is left
+    remaining = max(0.0, timeout - (time.perf_counter() - started))
+    try:
+        await asyncio.wait_for(_idle.wait(), remaining)
+    except asyncio.TimeoutError:
+        pass
+    _queue = None
+    logger.info("Job workers stopped", extra={"fields": {
+        "seconds": round(time.perf_counter() - started, 3),
+        **_stats,
+    }})
+
+
+def job_queue_stats() -> dict:
+    """Return queue depth, in-flight jobs and outcome counters."""
+    stats = _queue.stats() if _queue is not None else {"backend": JOB_QUEUE_BACKEND}
+    return {**stats, "workers": len(_workers), "in_flight": _in_flight, **_stats}
@@ -0,0 +1,167 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Logging configurations
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Comma-separated "path_prefix=rate" pairs, e.g. "/api/health=0,/api/blogs=0.1"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "/api/health=0.01")
+LOG_DEFAULT_SAMPLE_RATE = float(os.getenv("LOG_DEFAULT_SAMPLE_RATE", "1.0"))
+LOG_REDACT_HEADERS = os.getenv("LOG_REDACT_HEADERS", "authorization,cookie,set-cookie")
+
+_REDACTED = "[REDACTED]"
+_redacted_headers = frozenset(h.strip().lower() for h in LOG_REDACT_HEADERS.split(",") if h.strip())
+
+
+def _parse_sample_rates(spec: str) -> list:
+    rates = []
+    for item in spec.split(","):
+        prefix, sep, rate = item.strip().partition("=")
+        if sep and prefix:
+            rates.append((prefix, float(rate)))
+    # Longest prefix wins
+    return sorted(rates, key=lambda r: len(r[0]), reverse=True)
+
+
+_sample_rates = _parse_sample_rates(LOG_SAMPLE_RATES)
+_sample_rate_cache: Dict[str, float] = {}
+
+
+def sample_rate(path: str) -> float:
+    """Return the configured sampling rate for a request path."""
+    rate = _sample_rate_cache.get(path)
+    if rate is None:
+        rate = LOG_DEFAULT_SAMPLE_RATE
+        for prefix, prefix_rate in _sample_rates:
+            if path.startswith(prefix):
+                rate = prefix_rate
+                break
+        if len(_sample_rate_cache) < 4096:
+            _sample_rate_cache[path] = rate
+    return rate
+
+
+def should_sample(path: str) -> bool:
+    """Decide whether a request to path gets logged."""
+    rate = sample_rate(path)
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def redact_headers(headers) -> dict:
+    """Decode ASGI header pairs (or a mapping) and mask sensitive values."""
+    items = headers.items() if hasattr(headers, "items") else headers
+    redacted = {}
+    for key, value in items:
+        if isinstance(key, bytes):
+            key = key.decode("latin-1")
+            value = value.decode("latin-1")
+        redacted[key] = _REDACTED if key.lower() in _redacted_headers else value
+    return redacted
+
+
+class JSONFormatter(logging.Formatter):
+    """Render records as one JSON object per line.
+
+    Structured fields are passed with ``extra={"fields": {...}}``. A ``headers``
+    field may hold raw ASGI header pairs; they are decoded and redacted here,
+    on the listener thread, rather than in the request path.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+            if "headers" in fields:
+                entry["headers"] = redact_headers(fields["headers"])
+
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that defers all formatting and drops records when full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def setup_logging(background: bool = True) -> None:
+    """Route the ``app`` loggers through a bounded queue to a JSON stdout writer.
+
+    With ``background=False`` records are written inline instead. Serverless
+    runtimes freeze the process between invocations, so a writer thread
+    could be stopped with records still queued.
+    """
+    global _listener, _queue_handler
+    app_logger = logging.getLogger("app")
+    if _listener is not None or app_logger.handlers:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.propagate = False
+    if not background:
+        app_logger.addHandler(stream_handler)
+        return
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=False)
+    _listener.start()
+    app_logger.addHandler(_queue_handler)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> dict:
+    """Return queue depth and dropped record counters."""
+    if _queue_handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a logger under the ``app`` hierarchy."""
+    return logging.getLogger(name if name.startswith("app") else f"app.{name}")
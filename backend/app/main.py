@@ -1,104 +1,75 @@
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, PlainTextResponse
+from app import jobs, metrics
 from app.routes import auth, blogs, users
-from app.database import connect_to_mongo, close_mongo_connection
+from app.repositories import STORAGE_BACKEND, close_storage, get_blog_repository, init_storage, storage_stats
+from app.middleware import CompressionMiddleware, CORSPolicy, CORSMiddleware, RequestLoggingMiddleware
+from app.utils.authors import author_cache_stats
+from app.utils.blog_cache import blog_cache_stats
+from app.utils.tag_counts import tag_cache_stats
+from app.utils.auth import auth_cache_stats, password_hashing_stats, shutdown_password_hashing
+from app.utils.list_cache import cancel_list_refreshes, list_cache_stats
+from app.utils.rate_limit import rate_limit_stats
+from app.utils.rendering import render_cache_stats
+from app.utils.single_flight import single_flight_stats
+from app.utils.search import search_stats, start_search_indexing, stop_search_indexing
+from app.log import get_logger, logging_stats, setup_logging, shutdown_logging
 import os
 import sys
-import traceback
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request as StarletteRequest
 from starlette.responses import Response
 from mangum import Mangum
 
-# Print Python information for debugging
-print(f"Python version: {sys.version}")
-print(f"Python path: {sys.path}")
-
-# Request logger middleware for debugging
-class RequestLoggerMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: StarletteRequest, call_next):
-        print(f"Request received: {request.method} {request.url.path}")
-        print(f"Headers: {request.headers}")
-        try:
-            response = await call_next(request)
-            print(f"Response status: {response.status_code}")
-            print(f"Response headers: {response.headers}")
-            return response
-        except Exception as e:
-            print(f"Error during request: {e}")
-            raise
-
-# Custom middleware for handling OPTIONS requests
-class OptionsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: StarletteRequest, call_next):
-        if request.method == "OPTIONS":
-            print(f"OPTIONS request detected for {request.url.path}")
-            print(f"Request headers: {request.headers}")
-            # Return a successful response for OPTIONS requests
-            response = Response(
-                content="",
-                status_code=200
-            )
-            # Add CORS headers
-            response.headers["Access-Control-Allow-Origin"] = "https://qblog-nrzw.vercel.app"
-            response.headers["Access-Control-Allow-Methods"] = "GET,OPTIONS,PATCH,DELETE,POST,PUT"
-            response.headers["Access-Control-Allow-Headers"] = "X-CSRF-Token, X-Requested-With, Accept, Accept-Version, Content-Length, Content-MD5, Content-Type, Date, X-Api-Version, Authorization, Origin"
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            response.headers["Access-Control-Max-Age"] = "86400"
-            print(f"OPTIONS response headers: {response.headers}")
-            return response
-        return await call_next(request)
-
-app = FastAPI(title="QBlog API", description="API for the QBlog blogging platform")
+# Serverless mode (on by default on Vercel and AWS Lambda) keeps cold starts
+# short: no startup work, no background threads, indexes via "app.manage migrate"
+SERVERLESS_MODE = os.getenv(
+    "SERVERLESS_MODE",
+    "true" if os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "false",
+).lower() == "true"
 
-# Add the request logger middleware first
-app.add_middleware(RequestLoggerMiddleware)
+# Structured logs are written as JSON lines, by a background thread outside serverless mode
+setup_logging(background=not SERVERLESS_MODE)
+logger = get_logger(__name__)
 
-# Add the OPTIONS middleware second (order matters!)
-app.add_middleware(OptionsMiddleware)
+app = FastAPI(title="QBlog API", description="API for the QBlog blogging platform")
 
 # Determine allowed origins from environment variable or use defaults
 DEFAULT_ORIGINS = "https://qblog-nrzw.vercel.app,http://localhost:5173,http://localhost:5174,http://127.0.0.1:5173,http://127.0.0.1:5174"
 ALLOWED_ORIGINS = os.environ.get("ALLOWED_ORIGINS", DEFAULT_ORIGINS)
 allowed_origins = ALLOWED_ORIGINS.split(",")
+ALLOWED_ORIGIN_REGEX = os.environ.get("ALLOWED_ORIGIN_REGEX", r"https://(.*\.)?vercel\.app")  # Allow all Vercel subdomains
 
-# Print for debugging
-print(f"Configured CORS with allowed origins: {allowed_origins}")
-print(f"Environment: {os.environ.get('VERCEL_ENV', 'development')}")
+logger.info("Configured CORS", extra={"fields": {
+    "allowed_origins": allowed_origins,
+    "environment": os.environ.get("VERCEL_ENV", "development"),
+}})
 
-# CORS configuration
-app.add_middleware(
-    CORSMiddleware,
+# CORS configuration, shared by the middleware and the error handler
+cors_policy = CORSPolicy(
     allow_origins=allowed_origins,
-    allow_origin_regex=r"https://(.*\.)?vercel\.app",  # Allow all Vercel subdomains
+    allow_origin_regex=ALLOWED_ORIGIN_REGEX,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["X-CSRF-Token", "X-Requested-With", "Accept", "Accept-Version", 
                   "Content-Length", "Content-MD5", "Content-Type", "Date", 
-                  "X-Api-Version", "Authorization", "Origin"],
-    expose_headers=["Content-Length", "Content-Type"],
+                  "X-Api-Version", "Authorization", "Origin", "If-None-Match"],
+    expose_headers=["Content-Length", "Content-Type", "ETag", "X-Next-Cursor", "Retry-After"],
     max_age=86400,  # 24 hours caching of preflight requests
 )
 
-# Add CORS headers middleware to ensure headers are added to every response
-@app.middleware("http")
-async def add_cors_headers(request: Request, call_next):
-    response = await call_next(request)
-    # Ensure CORS headers are present
-    response.headers["Access-Control-Allow-Origin"] = "https://qblog-nrzw.vercel.app"
-    response.headers["Access-Control-Allow-Methods"] = "GET,OPTIONS,PATCH,DELETE,POST,PUT"
-    response.headers["Access-Control-Allow-Headers"] = "X-CSRF-Token, X-Requested-With, Accept, Accept-Version, Content-Length, Content-MD5, Content-Type, Date, X-Api-Version, Authorization, Origin"
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    return response
+# Middleware added last runs first: CORS answers preflights before anything else
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(RequestLoggingMiddleware)
+app.add_middleware(CORSMiddleware, policy=cors_policy)
 
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     error_detail = str(exc)
-    error_traceback = traceback.format_exc()
-    print(f"Global exception: {error_detail}")
-    print(f"Traceback: {error_traceback}")
+    logger.error("Global exception", exc_info=exc, extra={"fields": {"path": request.url.path}})
     
     # Add CORS headers to error responses
     response = JSONResponse(
@@ -106,11 +77,8 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": "Internal server error", "message": error_detail}
     )
     
-    # Add CORS headers
-    response.headers["Access-Control-Allow-Origin"] = "https://qblog-nrzw.vercel.app"
-    response.headers["Access-Control-Allow-Methods"] = "GET,OPTIONS,PATCH,DELETE,POST,PUT"
-    response.headers["Access-Control-Allow-Headers"] = "X-CSRF-Token, X-Requested-With, Accept, Accept-Version, Content-Length, Content-MD5, Content-Type, Date, X-Api-Version, Authorization, Origin"
-    response.headers["Access-Control-Allow-Credentials"] = "true"
+    # Errors are rendered outside the middleware stack, so add CORS headers here
+    response.headers.update(cors_policy.response_headers(request.headers.get("origin")))
     return response
 
 # Include routers
@@ -121,29 +89,123 @@ app.include_router(users.router, prefix="/api/users", tags=["Users"])
 # Event handlers for database connection
 @app.on_event("startup")
 async def startup_db_client():
+    if SERVERLESS_MODE:
+        # Storage connects lazily on first use and is reused by warm invocations
+        return
+    metrics.start_event_loop_monitor()
     try:
-        await connect_to_mongo()
-        print("Database connection established successfully")
-    except Exception as e:
-        print(f"Error during startup: {e}")
-        print(traceback.format_exc())
+        await init_storage()
+        logger.info("Storage initialized", extra={"fields": {"backend": STORAGE_BACKEND}})
+        # Only now: the storage backend registers its own job handlers when imported,
+        # and durable jobs left by a previous process are claimed as soon as workers run
+        jobs.start_job_workers()
+        start_search_indexing(get_blog_repository())
+    except Exception:
+        logger.exception("Error during startup")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    await close_mongo_connection()
+    metrics.stop_event_loop_monitor()
+    await stop_search_indexing()
+    await cancel_list_refreshes()
+    # Queued jobs still need storage, so they finish before it closes
+    await jobs.drain_jobs()
+    await close_storage()
+    shutdown_password_hashing()
+    shutdown_logging()
 
 @app.get("/api/health", tags=["Health"])
 async def health_check():
-    return {"status": "ok", "message": "QBlog API is running"}
+    return {
+        "status": "ok",
+        "message": "QBlog API is running",
+        "storage": storage_stats(),
+        "caches": {
+            "authors": author_cache_stats(),
+            "blogs": blog_cache_stats(),
+            "lists": list_cache_stats(),
+            "tags": tag_cache_stats(),
+            "html": render_cache_stats(),
+            "auth": auth_cache_stats(),
+        },
+        "password_hashing": password_hashing_stats(),
+        "rate_limits": rate_limit_stats(),
+        "jobs": jobs.job_queue_stats(),
+        "single_flight": single_flight_stats(),
+        "search": search_stats(),
+        "logging": logging_stats(),
+        "serverless": SERVERLESS_MODE,
+        "cold_start": metrics.cold_start,
+    }
+
+def _cache_stat(field: str):
+    def collect():
+        caches = {
+            "authors": author_cache_stats(),
+            "blogs": blog_cache_stats(),
+            "lists": list_cache_stats(),
+            "tags": tag_cache_stats(),
+            "html": render_cache_stats(),
+            "tokens": auth_cache_stats()["tokens"],
+            "principals": auth_cache_stats()["principals"],
+        }
+        return {(("cache", name),): stats[field] for name, stats in caches.items()}
+    return collect
+
+metrics.register_counter("qblog_cache_hits_total", "Cache hits since startup.", _cache_stat("hits"))
+metrics.register_counter("qblog_cache_misses_total", "Cache misses since startup.", _cache_stat("misses"))
+metrics.register_gauge("qblog_cache_entries", "Entries currently cached.", _cache_stat("size"))
+metrics.register_gauge(
+    "qblog_password_hash_queue",
+    "Password hashing jobs waiting for or running on the executor.",
+    lambda: {
+        (("state", "waiting"),): password_hashing_stats()["waiting"],
+        (("state", "in_flight"),): password_hashing_stats()["in_flight"],
+    },
+)
+metrics.register_gauge(
+    "qblog_job_queue",
+    "Background jobs waiting on the in-memory queue or running.",
+    lambda: {
+        (("state", "pending"),): jobs.job_queue_stats().get("pending", 0),
+        (("state", "in_flight"),): jobs.job_queue_stats()["in_flight"],
+    },
+)
+metrics.register_counter(
+    "qblog_single_flight_requests_total",
+    "Reads that ran a storage call, or were coalesced onto an identical one in flight, since startup.",
+    lambda: {
+        (("flight", name), ("outcome", outcome)): stats[field]
+        for name, stats in single_flight_stats().items()
+        for outcome, field in (("executed", "calls"), ("coalesced", "coalesced"), ("failed", "failures"))
+    },
+)
+metrics.register_gauge(
+    "qblog_mongo_pool_connections",
+    "MongoDB pool connections that are open, checked out, or being waited for.",
+    lambda: {
+        (("state", state),): storage_stats()["pool"][state]
+        for state in ("open", "checked_out", "waiting")
+    } if STORAGE_BACKEND == "mongo" else {},
+)
+metrics.register_gauge(
+    "qblog_log_records",
+    "Log records queued for output or dropped because the queue was full.",
+    lambda: {(("state", state),): value for state, value in logging_stats().items()},
+)
+
+@app.get("/api/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Expose metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        metrics.render_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 @app.get("/api/cors-test", tags=["Health"])
 async def cors_test(request: Request):
     """Endpoint to test CORS configuration."""
-    print(f"CORS test requested from {request.client.host}")
-    print(f"Headers: {request.headers}")
-    
-    # Get response and explicitly add CORS headers
-    response = JSONResponse(content={
+    return JSONResponse(content={
         "status": "ok", 
         "message": "CORS is working correctly",
         "cors_allowed_origins": allowed_origins,
@@ -152,31 +214,15 @@ async def cors_test(request: Request):
         "method": request.method,
         "url": str(request.url)
     })
-    
-    # Explicitly add CORS headers
-    response.headers["Access-Control-Allow-Origin"] = "https://qblog-nrzw.vercel.app"
-    response.headers["Access-Control-Allow-Methods"] = "GET,OPTIONS,PATCH,DELETE,POST,PUT"
-    response.headers["Access-Control-Allow-Headers"] = "X-CSRF-Token, X-Requested-With, Accept, Accept-Version, Content-Length, Content-MD5, Content-Type, Date, X-Api-Version, Authorization, Origin"
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    
-    print(f"Response headers: {response.headers}")
-    return response
 
 @app.options("/api/test-options", tags=["Health"])
 async def test_options():
-    """Dedicated endpoint for testing OPTIONS requests."""
-    print("OPTIONS test endpoint called")
-    return Response(
-        content="",
-        status_code=200,
-        headers={
-            "Access-Control-Allow-Origin": "https://qblog-nrzw.vercel.app",
-            "Access-Control-Allow-Methods": "GET,OPTIONS,PATCH,DELETE,POST,PUT",
-            "Access-Control-Allow-Headers": "X-CSRF-Token, X-Requested-With, Accept, Accept-Version, Content-Length, Content-MD5, Content-Type, Date, X-Api-Version, Authorization, Origin",
-            "Access-Control-Allow-Credentials": "true",
-            "Access-Control-Max-Age": "86400"
-        }
-    )
+    """Dedicated endpoint for testing OPTIONS requests.
+    
+    Preflights are answered by CORSMiddleware, so this is only reached if
+    the middleware is removed.
+    """
+    return Response(content="", status_code=200)
 
 @app.get("/", tags=["Health"])
 async def root():
@@ -205,5 +251,9 @@ async def root():
         "packages": packages_info
     }
 
-# Handler for AWS Lambda
-handler = Mangum(app) 
\ No newline at end of file
+# Handler for AWS Lambda. Mangum runs lifespan events on every invocation,
+# which would close the database client after each request, so serverless
+# mode turns them off.
+handler = Mangum(app, lifespan="off" if SERVERLESS_MODE else "auto")
+
+metrics.record_import_time(time.perf_counter() - _import_started) 
\ No newline at end of file
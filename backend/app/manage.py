@@ -0,0 +1,104 @@
+"""Maintenance commands for the QBlog backend.
+
+Usage (from the backend directory):
+    python -m app.manage migrate
+    python -m app.manage backfill-excerpts
+    python -m app.manage backfill-html
+    python -m app.manage build-search-index
+    python -m app.manage reconcile-tags
+"""
+import argparse
+import asyncio
+
+from app.repositories import STORAGE_BACKEND, close_storage, get_blog_repository, init_storage
+from app.utils.rendering import attach_html
+from app.utils.search import SEARCH_SNAPSHOT_PATH, build_search_index
+from app.utils.summary import summarize
+
+
+async def migrate() -> None:
+    """Create indexes / schema for the configured storage backend."""
+    if STORAGE_BACKEND == "mongo":
+        from app.database import create_indexes
+        await create_indexes()
+    else:
+        # SQLite creates its schema when the storage is opened; memory has none
+        await init_storage()
+    await close_storage()
+    print(f"Migrated {STORAGE_BACKEND} storage")
+
+
+async def backfill_excerpts() -> None:
+    """Store excerpt, word count and reading time on blogs written before they existed."""
+    await init_storage()
+    blogs = get_blog_repository()
+    updated = 0
+    try:
+        async for batch in blogs.export():
+            missing = [blog for blog in batch if "excerpt" not in blog]
+            # updated_at is left alone: the posts themselves didn't change
+            await asyncio.gather(*(blogs.update(blog["id"], summarize(blog["content"])) for blog in missing))
+            updated += len(missing)
+    finally:
+        await close_storage()
+    print(f"Backfilled {updated} blogs")
+
+
+async def backfill_html() -> None:
+    """Store rendered HTML on blogs written before rendering existed or by an older renderer."""
+    await init_storage()
+    blogs = get_blog_repository()
+    updated = 0
+    try:
+        async for batch in blogs.export():
+            stale = [blog for blog in batch if attach_html(blog)]
+            await asyncio.gather(*(
+                blogs.update(blog["id"], {"content_html": blog["content_html"], "content_hash": blog["content_hash"]})
+                for blog in stale
+            ))
+            updated += len(stale)
+    finally:
+        await close_storage()
+    print(f"Rendered {updated} blogs")
+
+
+async def build_search_snapshot() -> None:
+    """Write or refresh the search snapshot, which serverless deployments need to search."""
+    if not SEARCH_SNAPSHOT_PATH:
+        raise SystemExit("SEARCH_SNAPSHOT_PATH is not set")
+    await init_storage()
+    try:
+        await build_search_index(get_blog_repository())
+    finally:
+        await close_storage()
+    print(f"Search snapshot written to {SEARCH_SNAPSHOT_PATH}")
+
+
+async def reconcile_tags() -> None:
+    """Recount posts per tag and repair counters that drifted."""
+    await init_storage()
+    try:
+        repaired = await get_blog_repository().reconcile_tag_counts()
+    finally:
+        await close_storage()
+    print(f"Repaired {repaired} tag counters")
+
+
+COMMANDS = {
+    "migrate": migrate,
+    "backfill-excerpts": backfill_excerpts,
+    "backfill-html": backfill_html,
+    "build-search-index": build_search_snapshot,
+    "reconcile-tags": reconcile_tags,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command]())
+
+
+if __name__ == "__main__":
+    main()
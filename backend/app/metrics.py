@@ -0,0 +1,307 @@
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import time
+
+from app.log import get_logger
+
+logger = get_logger(__name__)
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus bucket layout.
+
+    Observations only append to plain lists and counters, so they are cheap
+    enough to record on every request. They must come from one thread (the
+    event loop); other threads hand samples over through record_mongo_command.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# Metric families, keyed by label values
+request_counts: Dict[Tuple[str, str, int], int] = {}
+request_latency: Dict[Tuple[str, str], Histogram] = {}
+mongo_latency: Dict[Tuple[str, str], Histogram] = {}
+mongo_failures: Dict[Tuple[str, str], int] = {}
+event_loop_lag = Histogram((0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+markdown_render_latency = Histogram((0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+# Per encoding: responses, bytes in and out, CPU seconds, and cached compressed bodies reused
+compression_totals: Dict[str, Dict[str, float]] = {}
+compression_ratio: Dict[str, Histogram] = {}
+requests_in_flight = 0
+
+# Cold-start timings in seconds: importing the app and serving its first request
+cold_start: Dict[str, Optional[float]] = {"import_seconds": None, "first_request_seconds": None}
+
+# Samples handed over from pymongo's monitoring threads: (command, collection, seconds, ok)
+_mongo_samples = deque(maxlen=100000)
+
+# Extra gauges and counters rendered at scrape time: name -> (help, callback returning {labels: value})
+_gauges: Dict[str, Tuple[str, Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]]] = {}
+_counters: Dict[str, Tuple[str, Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]]] = {}
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    """Record one finished HTTP request."""
+    key = (method, route, status)
+    request_counts[key] = request_counts.get(key, 0) + 1
+
+    histogram = request_latency.get((method, route))
+    if histogram is None:
+        histogram = request_latency[(method, route)] = Histogram()
+    histogram.observe(seconds)
+
+
+def observe_markdown_render(seconds: float) -> None:
+    """Record how long rendering one post's Markdown to HTML took."""
+    markdown_render_latency.observe(seconds)
+
+
+def _compression_totals(encoding: str) -> Dict[str, float]:
+    totals = compression_totals.get(encoding)
+    if totals is None:
+        totals = compression_totals[encoding] = {
+            "responses": 0, "input_bytes": 0, "output_bytes": 0, "cpu_seconds": 0.0, "reused": 0,
+        }
+    return totals
+
+
+def observe_compression(encoding: str, size_in: int, size_out: int, cpu_seconds: float) -> None:
+    """Record one compressed response body."""
+    totals = _compression_totals(encoding)
+    totals["responses"] += 1
+    totals["input_bytes"] += size_in
+    totals["output_bytes"] += size_out
+    totals["cpu_seconds"] += cpu_seconds
+    histogram = compression_ratio.get(encoding)
+    if histogram is None:
+        histogram = compression_ratio[encoding] = Histogram((1.5, 2.0, 3.0, 4.0, 6.0, 8.0, 12.0, 16.0))
+    histogram.observe(size_in / size_out if size_out else 1.0)
+
+
+def observe_compression_reuse(encoding: str) -> None:
+    """Record a response served from an already compressed cached body."""
+    _compression_totals(encoding)["reused"] += 1
+
+
+def record_import_time(seconds: float) -> None:
+    """Remember how long importing the application took."""
+    cold_start["import_seconds"] = seconds
+
+
+def _record_first_request(route: str, seconds: float) -> None:
+    cold_start["first_request_seconds"] = seconds
+    logger.info("First request served", extra={"fields": {
+        "route": route,
+        "import_ms": round((cold_start["import_seconds"] or 0) * 1000, 1),
+        "first_request_ms": round(seconds * 1000, 1),
+    }})
+
+
+def register_gauge(name: str, help_text: str, callback: Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]) -> None:
+    """Register a gauge whose values are read from callback at scrape time."""
+    _gauges[name] = (help_text, callback)
+
+
+def register_counter(name: str, help_text: str, callback: Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]) -> None:
+    """Register a counter (a value that only grows until restart) read from callback at scrape time.
+
+    Prometheus convention: the name ends in ``_total``.
+    """
+    _counters[name] = (help_text, callback)
+
+
+def record_mongo_command(command: str, collection: str, seconds: float, ok: bool) -> None:
+    """Hand over one MongoDB command timing; safe to call from any thread."""
+    _mongo_samples.append((command, collection, seconds, ok))
+
+
+def _drain_mongo_samples() -> None:
+    while _mongo_samples:
+        command, collection, seconds, ok = _mongo_samples.popleft()
+        key = (collection, command)
+        histogram = mongo_latency.get(key)
+        if histogram is None:
+            histogram = mongo_latency[key] = Histogram()
+        histogram.observe(seconds)
+        if not ok:
+            mongo_failures[key] = mongo_failures.get(key, 0) + 1
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route counts, latency and in-flight requests.
+
+    Routes are labelled by their path template (e.g. ``/api/blogs/{blog_id}``)
+    so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global requests_in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight -= 1
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", "unmatched")
+            observe_request(scope["method"], route, status_code, elapsed)
+            if cold_start["first_request_seconds"] is None:
+                _record_first_request(route, elapsed)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Measure how late the event loop wakes up from a fixed sleep.
+
+    Pending MongoDB samples are folded in on the same tick so the hand-over
+    queue never fills up between scrapes.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag.observe(max(0.0, loop.time() - start - interval))
+        _drain_mongo_samples()
+
+
+_lag_task: Optional[asyncio.Task] = None
+
+
+def start_event_loop_monitor(interval: float = 0.5) -> None:
+    """Start the lag monitor on the running loop (idempotent)."""
+    global _lag_task
+    if _lag_task is None or _lag_task.done():
+        _lag_task = asyncio.get_running_loop().create_task(monitor_event_loop_lag(interval))
+
+
+def stop_event_loop_monitor() -> None:
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Iterable[Tuple[str, object]]) -> str:
+    rendered = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f"{{{rendered}}}" if rendered else ""
+
+
+def _render_histogram(lines: List[str], name: str, labels: Tuple[Tuple[str, object], ...], histogram: Histogram) -> None:
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    _drain_mongo_samples()
+    lines = []
+
+    lines.append("# HELP qblog_http_requests_total HTTP requests by method, route and status.")
+    lines.append("# TYPE qblog_http_requests_total counter")
+    for (method, route, status), count in sorted(request_counts.items()):
+        lines.append(f"qblog_http_requests_total{_labels((('method', method), ('route', route), ('status', status)))} {count}")
+
+    lines.append("# HELP qblog_http_request_duration_seconds HTTP request latency by method and route.")
+    lines.append("# TYPE qblog_http_request_duration_seconds histogram")
+    for (method, route), histogram in sorted(request_latency.items()):
+        _render_histogram(lines, "qblog_http_request_duration_seconds", (("method", method), ("route", route)), histogram)
+
+    lines.append("# HELP qblog_http_requests_in_flight HTTP requests currently being served.")
+    lines.append("# TYPE qblog_http_requests_in_flight gauge")
+    lines.append(f"qblog_http_requests_in_flight {requests_in_flight}")
+
+    lines.append("# HELP qblog_event_loop_lag_seconds Delay of the event loop waking from a timed sleep.")
+    lines.append("# TYPE qblog_event_loop_lag_seconds histogram")
+    _render_histogram(lines, "qblog_event_loop_lag_seconds", (), event_loop_lag)
+
+    lines.append("# HELP qblog_markdown_render_duration_seconds Time to render a post's Markdown to HTML (cache misses only).")
+    lines.append("# TYPE qblog_markdown_render_duration_seconds histogram")
+    _render_histogram(lines, "qblog_markdown_render_duration_seconds", (), markdown_render_latency)
+
+    lines.append("# HELP qblog_compression_ratio Uncompressed over compressed size of response bodies, by encoding.")
+    lines.append("# TYPE qblog_compression_ratio histogram")
+    for encoding, histogram in sorted(compression_ratio.items()):
+        _render_histogram(lines, "qblog_compression_ratio", (("encoding", encoding),), histogram)
+
+    for field, metric, help_text in (
+        ("input_bytes", "qblog_compression_input_bytes_total", "Response bytes before compression, by encoding."),
+        ("output_bytes", "qblog_compression_output_bytes_total", "Response bytes after compression, by encoding."),
+        ("cpu_seconds", "qblog_compression_cpu_seconds_total", "CPU time spent compressing responses, by encoding."),
+        ("reused", "qblog_compression_reused_total", "Responses served from a cached compressed body, by encoding."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for encoding, totals in sorted(compression_totals.items()):
+            lines.append(f"{metric}{_labels((('encoding', encoding),))} {totals[field]}")
+
+    lines.append("# HELP qblog_mongodb_command_duration_seconds MongoDB command latency by collection and operation.")
+    lines.append("# TYPE qblog_mongodb_command_duration_seconds histogram")
+    for (collection, command), histogram in sorted(mongo_latency.items()):
+        _render_histogram(lines, "qblog_mongodb_command_duration_seconds", (("collection", collection), ("command", command)), histogram)
+
+    lines.append("# HELP qblog_mongodb_command_failures_total Failed MongoDB commands by collection and operation.")
+    lines.append("# TYPE qblog_mongodb_command_failures_total counter")
+    for (collection, command), count in sorted(mongo_failures.items()):
+        lines.append(f"qblog_mongodb_command_failures_total{_labels((('collection', collection), ('command', command)))} {count}")
+
+    lines.append("# HELP qblog_cold_start_seconds Time to import the app and to serve its first request.")
+    lines.append("# TYPE qblog_cold_start_seconds gauge")
+    for phase in ("import", "first_request"):
+        value = cold_start[f"{phase}_seconds"]
+        if value is not None:
+            lines.append(f"qblog_cold_start_seconds{_labels((('phase', phase),))} {value}")
+
+    registered = [(name, "counter", entry) for name, entry in _counters.items()]
+    registered += [(name, "gauge", entry) for name, entry in _gauges.items()]
+    for name, kind, (help_text, callback) in sorted(registered):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        try:
+            values = callback()
+        except Exception as e:
+            logger.warning(f"Metrics {kind} {name} failed: {e}")
+            continue
+        for labels, value in values.items():
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
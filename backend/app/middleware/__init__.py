@@ -0,0 +1,4 @@
+# Middleware package
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.cors import CORSPolicy, CORSMiddleware
+from app.middleware.request_log import RequestLoggingMiddleware
@@ -0,0 +1,96 @@
+from starlette.datastructures import MutableHeaders
+
+from app.utils.compression import (
+    COMPRESSION_ENABLED,
+    COMPRESSION_MIN_SIZE,
+    StreamCompressor,
+    compress,
+    is_compressible,
+    negotiate,
+)
+
+
+def _weaken_etag(headers) -> None:
+    # The compressed bytes differ from the ones the strong ETag was computed for
+    etag = headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing JSON and text responses.
+
+    The encoding is negotiated from Accept-Encoding (zstd, gzip or deflate).
+    Single-message bodies under ``minimum_size`` are sent as is; streamed
+    bodies are compressed chunk by chunk. Responses that already carry a
+    Content-Encoding (e.g. precompressed cached posts) pass through.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate(accept_encoding)
+
+        start_message = None
+        stream = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, stream, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if stream is not None:
+                message["body"] = stream.compress(message.get("body", b""), final=not message.get("more_body", False))
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if "content-encoding" in headers or not is_compressible(headers.get("content-type", "")):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if "accept-encoding" not in headers.get("vary", "").lower():
+                headers.add_vary_header("Accept-Encoding")
+            if encoding is None or (not more_body and len(body) < self.minimum_size):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            _weaken_etag(headers)
+            if more_body:
+                stream = StreamCompressor(encoding)
+                del headers["Content-Length"]
+                message["body"] = stream.compress(body)
+            else:
+                message["body"] = compress(body, encoding)
+                headers["Content-Length"] = str(len(message["body"]))
+            await send(start_message)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,136 @@
+from typing import Iterable, List, Optional, Tuple
+import re
+
+Headers = List[Tuple[bytes, bytes]]
+
+# Upper bound on remembered per-origin header sets (regex matches are open ended)
+_MAX_CACHED_ORIGINS = 1024
+
+
+class CORSPolicy:
+    """Precomputed CORS configuration shared by the middleware and error handlers.
+
+    Every header value is encoded once at startup; per request only the
+    origin is looked up and the matching header list is reused.
+    """
+
+    def __init__(
+        self,
+        allow_origins: Iterable[str],
+        allow_origin_regex: Optional[str] = None,
+        allow_methods: Iterable[str] = ("GET",),
+        allow_headers: Iterable[str] = (),
+        expose_headers: Iterable[str] = (),
+        allow_credentials: bool = False,
+        max_age: int = 600,
+    ):
+        self.allow_origins = frozenset(o.strip() for o in allow_origins if o.strip())
+        self.allow_all_origins = "*" in self.allow_origins
+        self.allow_origin_regex = re.compile(allow_origin_regex) if allow_origin_regex else None
+
+        common = []
+        if allow_credentials:
+            common.append((b"access-control-allow-credentials", b"true"))
+        common.append((b"vary", b"Origin"))
+
+        self._simple_headers = list(common)
+        if expose_headers:
+            self._simple_headers.append(
+                (b"access-control-expose-headers", ", ".join(expose_headers).encode("latin-1"))
+            )
+
+        self._preflight_headers = list(common) + [
+            (b"access-control-allow-methods", ",".join(allow_methods).encode("latin-1")),
+            (b"access-control-allow-headers", ", ".join(allow_headers).encode("latin-1")),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+        ]
+
+        self._origin_cache = {}
+
+    def is_allowed(self, origin: bytes) -> bool:
+        """Check an Origin header value against the allow-list."""
+        decoded = origin.decode("latin-1")
+        if self.allow_all_origins or decoded in self.allow_origins:
+            return True
+        return bool(self.allow_origin_regex and self.allow_origin_regex.fullmatch(decoded))
+
+    def _headers_for(self, origin: bytes) -> Optional[Tuple[Headers, Headers]]:
+        entry = self._origin_cache.get(origin)
+        if entry is None:
+            if not self.is_allowed(origin):
+                entry = False
+            else:
+                allow_origin = [(b"access-control-allow-origin", origin)]
+                entry = (allow_origin + self._simple_headers, allow_origin + self._preflight_headers)
+            if len(self._origin_cache) < _MAX_CACHED_ORIGINS:
+                self._origin_cache[origin] = entry
+        return entry or None
+
+    def simple_headers(self, origin: Optional[bytes]) -> Headers:
+        """Headers to add to an ordinary response for the given origin."""
+        entry = self._headers_for(origin) if origin else None
+        return entry[0] if entry else []
+
+    def preflight_headers(self, origin: Optional[bytes]) -> Headers:
+        """Headers for a preflight response, empty if the origin is not allowed."""
+        entry = self._headers_for(origin) if origin else None
+        return entry[1] if entry else []
+
+    def response_headers(self, origin: Optional[str]) -> dict:
+        """simple_headers as a str dict, for responses built outside the middleware."""
+        headers = self.simple_headers(origin.encode("latin-1") if origin else None)
+        return {k.decode("latin-1"): v.decode("latin-1") for k, v in headers}
+
+
+class CORSMiddleware:
+    """Pure ASGI middleware that answers OPTIONS requests and adds CORS headers.
+
+    Unlike BaseHTTPMiddleware it doesn't wrap the request in a task or
+    re-stream the body; it only appends precomputed headers to
+    ``http.response.start``.
+    """
+
+    def __init__(self, app, policy: CORSPolicy):
+        self.app = app
+        self.policy = policy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        for key, value in scope["headers"]:
+            if key == b"origin":
+                origin = value
+                break
+
+        if scope["method"] == "OPTIONS":
+            await self._preflight(origin, send)
+            return
+
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        extra_headers = self.policy.simple_headers(origin)
+        if not extra_headers:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def _preflight(self, origin: Optional[bytes], send):
+        headers = self.policy.preflight_headers(origin)
+        status = 200 if headers or origin is None else 400
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [*headers, (b"content-length", b"0")],
+        })
+        await send({"type": "http.response.body", "body": b""})
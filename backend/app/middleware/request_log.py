@@ -0,0 +1,53 @@
+import logging
+import time
+
+from app.log import get_logger, should_sample
+
+logger = get_logger("app.requests")
+
+
+class RequestLoggingMiddleware:
+    """Pure ASGI middleware that logs one sampled structured record per request.
+
+    Only references to the request data are put on the record; headers are
+    decoded and redacted by the log formatter on the listener thread, and
+    only when the level is DEBUG.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            logger.exception("request failed", extra={"fields": {
+                "method": scope["method"],
+                "path": scope["path"],
+            }})
+            raise
+
+        if (status_code >= 500 or should_sample(scope["path"])) and logger.isEnabledFor(logging.INFO):
+            fields = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                "client": scope.get("client"),
+            }
+            if logger.isEnabledFor(logging.DEBUG):
+                fields["headers"] = scope["headers"]
+            logger.info("request", extra={"fields": fields})
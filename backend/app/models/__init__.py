@@ -1,3 +1,3 @@
 # Import models to make them available from the models package
 from app.models.user import UserBase, UserCreate, UserResponse, UserLogin, UserInDB, TokenData
-from app.models.blog import BlogBase, BlogCreate, BlogUpdate, BlogInDB, BlogResponse 
\ No newline at end of file
+from app.models.blog import BlogBase, BlogCreate, BlogUpdate, BlogInDB, BlogResponse, BlogHTMLResponse, BlogSearchResult, BlogSummary, TagCount 
\ No newline at end of file
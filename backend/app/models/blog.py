@@ -30,4 +30,30 @@ class BlogResponse(BlogInDB):
     author_username: str
     
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+
+class BlogHTMLResponse(BlogResponse):
+    content_html: str
+
+
+class BlogSummary(BaseModel):
+    id: str
+    title: str
+    tags: List[str] = Field(default=[])
+    author_id: str
+    author_username: str
+    created_at: datetime
+    updated_at: datetime
+    excerpt: str = ""
+    word_count: int = 0
+    reading_time: int = 0
+
+
+class BlogSearchResult(BlogSummary):
+    score: float
+
+
+class TagCount(BaseModel):
+    tag: str
+    count: int
@@ -0,0 +1,94 @@
+# Storage backends for users and blogs.
+#
+# Routes depend only on UserRepository and BlogRepository; STORAGE_BACKEND
+# picks the implementation: "mongo" (default), "memory" or "sqlite".
+import os
+from typing import Optional
+from dotenv import load_dotenv
+
+from app.repositories.base import (
+    BlogRepository,
+    DuplicateError,
+    InvalidIdError,
+    PagePosition,
+    RepositoryError,
+    SUMMARY_FIELDS,
+    UserRepository,
+    new_id,
+    tag_diff,
+    validate_id,
+)
+
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "qblog.db")
+
+_users: Optional[UserRepository] = None
+_blogs: Optional[BlogRepository] = None
+_sqlite_storage = None
+
+
+def _create_repositories():
+    global _users, _blogs, _sqlite_storage
+
+    if STORAGE_BACKEND == "memory":
+        from app.repositories.memory import InMemoryBlogRepository, InMemoryUserRepository
+        _users, _blogs = InMemoryUserRepository(), InMemoryBlogRepository()
+    elif STORAGE_BACKEND == "sqlite":
+        from app.repositories.sqlite import SQLiteBlogRepository, SQLiteStorage, SQLiteUserRepository
+        _sqlite_storage = SQLiteStorage(SQLITE_PATH)
+        _users, _blogs = SQLiteUserRepository(_sqlite_storage), SQLiteBlogRepository(_sqlite_storage)
+    elif STORAGE_BACKEND == "mongo":
+        from app.repositories.mongo import MongoBlogRepository, MongoUserRepository
+        _users, _blogs = MongoUserRepository(), MongoBlogRepository()
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+
+def get_user_repository() -> UserRepository:
+    """Return the configured user repository (usable as a FastAPI dependency)."""
+    if _users is None:
+        _create_repositories()
+    return _users
+
+
+def get_blog_repository() -> BlogRepository:
+    """Return the configured blog repository (usable as a FastAPI dependency)."""
+    if _blogs is None:
+        _create_repositories()
+    return _blogs
+
+
+def set_repositories(users: UserRepository, blogs: BlogRepository) -> None:
+    """Install specific repositories, e.g. pre-seeded ones in benchmarks."""
+    global _users, _blogs
+    _users, _blogs = users, blogs
+
+
+async def init_storage() -> None:
+    """Connect to or open the configured backend at startup."""
+    if STORAGE_BACKEND == "mongo":
+        from app.database import connect_to_mongo
+        await connect_to_mongo()
+    get_user_repository()
+    if _sqlite_storage is not None:
+        await _sqlite_storage.open()
+
+
+async def close_storage() -> None:
+    """Release the backend's connections at shutdown."""
+    if STORAGE_BACKEND == "mongo":
+        from app.database import close_mongo_connection
+        await close_mongo_connection()
+    if _sqlite_storage is not None:
+        await _sqlite_storage.close()
+
+
+def storage_stats() -> dict:
+    """Return backend details for monitoring, e.g. MongoDB pool occupancy."""
+    stats = {"backend": STORAGE_BACKEND}
+    if STORAGE_BACKEND == "mongo":
+        from app.database import pool_stats
+        stats["pool"] = pool_stats()
+    return stats
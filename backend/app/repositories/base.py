@@ -0,0 +1,167 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from bson import ObjectId
+
+
+class RepositoryError(Exception):
+    """Base class for storage errors surfaced to the routes."""
+
+
+class InvalidIdError(RepositoryError, ValueError):
+    """Raised when an id is not a valid 24 character hex ObjectId."""
+
+
+class DuplicateError(RepositoryError):
+    """Raised when an insert violates a unique constraint."""
+
+    def __init__(self, field: str):
+        super().__init__(f"Duplicate value for {field}")
+        self.field = field
+
+
+# Position in the (created_at, id) descending blog order, as decoded from a page cursor
+PagePosition = Tuple[datetime, str]
+
+# Blog fields returned by summary listings: everything but ``content``
+SUMMARY_FIELDS = ("id", "title", "tags", "author_id", "created_at", "updated_at", "excerpt", "word_count", "reading_time")
+
+
+def new_id() -> str:
+    """Generate a new document id; every backend uses ObjectId hex strings."""
+    return str(ObjectId())
+
+
+def tag_diff(before: Iterable[str], after: Iterable[str]) -> Dict[str, int]:
+    """Return the per-tag count change when a blog's tags go from before to after."""
+    before, after = set(before or ()), set(after or ())
+    diff = {tag: 1 for tag in after - before}
+    diff.update({tag: -1 for tag in before - after})
+    return diff
+
+
+def validate_id(value: str) -> str:
+    """Return value if it is a valid id, raise InvalidIdError otherwise."""
+    if not isinstance(value, str) or not ObjectId.is_valid(value):
+        raise InvalidIdError(f"Invalid id: {value!r}")
+    return value
+
+
+class UserRepository(ABC):
+    """Storage for user documents.
+
+    Users are plain dicts with a string ``id`` plus ``username``, ``email``,
+    ``hashed_password`` and ``created_at``.
+    """
+
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[dict]:
+        """Return the user with this id, or None."""
+
+    @abstractmethod
+    async def get_usernames(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        """Map the given ids to usernames in one lookup, skipping unknown ids."""
+
+    @abstractmethod
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        """Return the user with this email, or None."""
+
+    @abstractmethod
+    async def find_by_username(self, username: str) -> Optional[dict]:
+        """Return the user with this username, or None."""
+
+    @abstractmethod
+    async def find_by_login(self, identifier: str) -> Optional[dict]:
+        """Return the user whose email or username equals identifier, or None."""
+
+    @abstractmethod
+    async def list(self, username: Optional[str] = None, skip: int = 0, limit: int = 10) -> List[dict]:
+        """Return a page of users, optionally filtered by username."""
+
+    @abstractmethod
+    async def insert(self, user: dict) -> dict:
+        """Store a new user and return it with its id.
+
+        Raises DuplicateError if the email or username is taken.
+        """
+
+
+class BlogRepository(ABC):
+    """Storage for blog documents.
+
+    Blogs are plain dicts with a string ``id`` plus ``title``, ``content``,
+    ``tags``, ``author_id``, ``created_at`` and ``updated_at``, and usually
+    the ``excerpt``, ``word_count`` and ``reading_time`` computed from the
+    content on write. Listings are always ordered by (created_at, id)
+    descending. Every write keeps the per-tag post counters up to date.
+    """
+
+    @abstractmethod
+    async def get(self, blog_id: str) -> Optional[dict]:
+        """Return the blog with this id, or None."""
+
+    @abstractmethod
+    async def get_many(self, blog_ids: Iterable[str], summary: bool = False) -> List[dict]:
+        """Return the blogs with these ids in one lookup, in no particular order.
+
+        Unknown or invalid ids are skipped; ``summary`` works as for list.
+        """
+
+    @abstractmethod
+    async def list(
+        self,
+        tag: Optional[str] = None,
+        author_id: Optional[str] = None,
+        after: Optional[PagePosition] = None,
+        skip: int = 0,
+        limit: int = 10,
+        summary: bool = False,
+    ) -> List[dict]:
+        """Return a page of blogs, newest first.
+
+        ``after`` restricts the page to blogs strictly older than that
+        position (keyset pagination); ``skip`` is applied after filtering.
+        With ``summary``, blogs carry only SUMMARY_FIELDS, so ``content`` is
+        never read or transferred.
+        """
+
+    @abstractmethod
+    def export(self, since: Optional[datetime] = None, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        """Yield all blogs in batches, oldest ``updated_at`` first.
+
+        ``since`` limits the export to blogs created or updated at or after
+        that time. Implementations stream, so memory use is bounded by
+        ``batch_size`` rather than the number of blogs.
+        """
+
+    @abstractmethod
+    async def insert(self, blog: dict) -> dict:
+        """Store a new blog (its ``id`` is set by the caller) and return it."""
+
+    @abstractmethod
+    async def insert_many(self, blogs: List[dict]) -> List[Optional[str]]:
+        """Store a batch of new blogs in one storage round trip.
+
+        Items are written independently (one failure doesn't stop the rest);
+        returns an error message per item, None for those that were stored.
+        """
+
+    @abstractmethod
+    async def update(self, blog_id: str, fields: dict, author_id: Optional[str] = None) -> Optional[dict]:
+        """Set fields on a blog and return the updated blog.
+
+        With ``author_id`` only that author's blog matches. The check and
+        the write are one atomic operation; None means nothing matched.
+        """
+
+    @abstractmethod
+    async def delete(self, blog_id: str, author_id: Optional[str] = None) -> bool:
+        """Delete a blog (only if written by ``author_id``, when given); return whether one matched."""
+
+    @abstractmethod
+    async def tag_counts(self) -> Dict[str, int]:
+        """Return the number of blogs per tag from the counters, without scanning blogs."""
+
+    @abstractmethod
+    async def reconcile_tag_counts(self) -> int:
+        """Recount tags from the blogs, fix the counters and return how many were wrong."""
@@ -0,0 +1,232 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.repositories.base import (
+    BlogRepository,
+    DuplicateError,
+    PagePosition,
+    SUMMARY_FIELDS,
+    UserRepository,
+    validate_id,
+)
+
+# Sort key of a blog: listings walk these lists from the end (newest first)
+SortKey = Tuple[datetime, str]
+
+
+def _copy(doc: dict) -> dict:
+    """Hand out copies so callers can't mutate the stored documents."""
+    copied = dict(doc)
+    if "tags" in copied:
+        copied["tags"] = list(copied["tags"])
+    return copied
+
+
+def _summary(doc: dict) -> dict:
+    """Copy only the summary fields of a blog."""
+    summary = {k: doc[k] for k in SUMMARY_FIELDS if k in doc}
+    summary["tags"] = list(summary.get("tags") or ())
+    return summary
+
+
+class InMemoryUserRepository(UserRepository):
+    """Users kept in process memory with hash indexes on email and username."""
+
+    def __init__(self):
+        self._users: Dict[str, dict] = {}
+        self._by_email: Dict[str, str] = {}
+        self._by_username: Dict[str, str] = {}
+        self._order: List[str] = []
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        validate_id(user_id)
+        user = self._users.get(user_id)
+        return _copy(user) if user else None
+
+    async def get_usernames(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        users = self._users
+        return {uid: users[uid]["username"] for uid in set(user_ids) if uid in users}
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        user_id = self._by_email.get(email)
+        return _copy(self._users[user_id]) if user_id else None
+
+    async def find_by_username(self, username: str) -> Optional[dict]:
+        user_id = self._by_username.get(username)
+        return _copy(self._users[user_id]) if user_id else None
+
+    async def find_by_login(self, identifier: str) -> Optional[dict]:
+        return await self.find_by_email(identifier) or await self.find_by_username(identifier)
+
+    async def list(self, username: Optional[str] = None, skip: int = 0, limit: int = 10) -> List[dict]:
+        if username:
+            user = await self.find_by_username(username)
+            return [user] if user and skip == 0 else []
+        return [_copy(self._users[uid]) for uid in self._order[skip:skip + limit]]
+
+    async def insert(self, user: dict) -> dict:
+        if user["email"] in self._by_email:
+            raise DuplicateError("email")
+        if user["username"] in self._by_username:
+            raise DuplicateError("username")
+
+        stored = _copy(user)
+        self._users[stored["id"]] = stored
+        self._by_email[stored["email"]] = stored["id"]
+        self._by_username[stored["username"]] = stored["id"]
+        self._order.append(stored["id"])
+        return _copy(stored)
+
+
+class InMemoryBlogRepository(BlogRepository):
+    """Blogs kept in process memory with sorted (created_at, id) indexes.
+
+    One sorted key list covers all blogs and one is kept per tag and per
+    author, so filtered pages, skips and cursor seeks are bisections and
+    slices rather than scans. A list of (updated_at, id) keys serves exports.
+    """
+
+    def __init__(self):
+        self._blogs: Dict[str, dict] = {}
+        self._all: List[SortKey] = []
+        self._by_tag: Dict[str, List[SortKey]] = defaultdict(list)
+        self._by_author: Dict[str, List[SortKey]] = defaultdict(list)
+        self._by_updated: List[SortKey] = []
+
+    @staticmethod
+    def _key(blog: dict) -> SortKey:
+        return (blog["created_at"], blog["id"])
+
+    @staticmethod
+    def _remove(index: List[SortKey], key: SortKey) -> None:
+        position = bisect_left(index, key)
+        if position < len(index) and index[position] == key:
+            del index[position]
+
+    def _index(self, blog: dict) -> None:
+        key = self._key(blog)
+        insort(self._all, key)
+        insort(self._by_author[blog["author_id"]], key)
+        insort(self._by_updated, (blog["updated_at"], blog["id"]))
+        for tag in set(blog.get("tags") or ()):
+            insort(self._by_tag[tag], key)
+
+    def _unindex(self, blog: dict) -> None:
+        key = self._key(blog)
+        self._remove(self._all, key)
+        self._remove(self._by_author[blog["author_id"]], key)
+        self._remove(self._by_updated, (blog["updated_at"], blog["id"]))
+        for tag in set(blog.get("tags") or ()):
+            self._remove(self._by_tag[tag], key)
+
+    def _walk(self, index: List[SortKey], after: Optional[PagePosition]) -> Iterator[SortKey]:
+        """Yield keys newest first, starting strictly below ``after``."""
+        end = bisect_left(index, after) if after else len(index)
+        for position in range(end - 1, -1, -1):
+            yield index[position]
+
+    async def get(self, blog_id: str) -> Optional[dict]:
+        validate_id(blog_id)
+        blog = self._blogs.get(blog_id)
+        return _copy(blog) if blog else None
+
+    async def get_many(self, blog_ids: Iterable[str], summary: bool = False) -> List[dict]:
+        copy = _summary if summary else _copy
+        return [copy(self._blogs[bid]) for bid in set(blog_ids) if bid in self._blogs]
+
+    async def list(
+        self,
+        tag: Optional[str] = None,
+        author_id: Optional[str] = None,
+        after: Optional[PagePosition] = None,
+        skip: int = 0,
+        limit: int = 10,
+        summary: bool = False,
+    ) -> List[dict]:
+        if tag and author_id:
+            # Drive the scan from the smaller index and filter on the other
+            index = min(self._by_tag.get(tag, []), self._by_author.get(author_id, []), key=len)
+        elif tag:
+            index = self._by_tag.get(tag, [])
+        elif author_id:
+            index = self._by_author.get(author_id, [])
+        else:
+            index = self._all
+
+        copy = _summary if summary else _copy
+
+        if not (tag and author_id):
+            # A single index answers the query exactly, so skip is a slice
+            end = bisect_left(index, after) if after else len(index)
+            start = max(0, end - skip - limit)
+            keys = index[start:max(0, end - skip)][::-1]
+            return [copy(self._blogs[key[1]]) for key in keys]
+
+        results = []
+        skipped = 0
+        for key in self._walk(index, after):
+            blog = self._blogs[key[1]]
+            if blog["author_id"] != author_id or tag not in blog["tags"]:
+                continue
+            if skipped < skip:
+                skipped += 1
+                continue
+            results.append(copy(blog))
+            if len(results) >= limit:
+                break
+        return results
+
+    async def export(self, since: Optional[datetime] = None, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        index = self._by_updated
+        start = bisect_left(index, (since, "")) if since else 0
+        while start < len(index):
+            keys = index[start:start + batch_size]
+            yield [_copy(self._blogs[key[1]]) for key in keys]
+            # Re-seek after the last key: the index may have changed while we yielded
+            start = bisect_right(index, keys[-1])
+
+    async def insert(self, blog: dict) -> dict:
+        stored = _copy(blog)
+        self._blogs[stored["id"]] = stored
+        self._index(stored)
+        return _copy(stored)
+
+    async def insert_many(self, blogs: List[dict]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = []
+        for blog in blogs:
+            if blog["id"] in self._blogs:
+                errors.append(f"Duplicate id {blog['id']}")
+                continue
+            await self.insert(blog)
+            errors.append(None)
+        return errors
+
+    async def update(self, blog_id: str, fields: dict, author_id: Optional[str] = None) -> Optional[dict]:
+        validate_id(blog_id)
+        blog = self._blogs.get(blog_id)
+        if blog is None or (author_id is not None and blog["author_id"] != author_id):
+            return None
+
+        self._unindex(blog)
+        blog.update(_copy(fields))
+        self._index(blog)
+        return _copy(blog)
+
+    async def delete(self, blog_id: str, author_id: Optional[str] = None) -> bool:
+        validate_id(blog_id)
+        blog = self._blogs.get(blog_id)
+        if blog is None or (author_id is not None and blog["author_id"] != author_id):
+            return False
+        del self._blogs[blog_id]
+        self._unindex(blog)
+        return True
+
+    async def tag_counts(self) -> Dict[str, int]:
+        # The per-tag indexes are the counters
+        return {tag: len(keys) for tag, keys in self._by_tag.items() if keys}
+
+    async def reconcile_tag_counts(self) -> int:
+        # Counts come straight from the indexes, so they cannot drift
+        return 0
@@ -0,0 +1,274 @@
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+from bson import ObjectId
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.database import get_database
+from app.jobs import enqueue, job
+from app.repositories.base import (
+    BlogRepository,
+    DuplicateError,
+    PagePosition,
+    SUMMARY_FIELDS,
+    UserRepository,
+    tag_diff,
+    validate_id,
+)
+
+
+BLOG_SORT = [("created_at", -1), ("_id", -1)]
+EXPORT_SORT = [("updated_at", 1), ("_id", 1)]
+SUMMARY_PROJECTION = {field: 1 for field in SUMMARY_FIELDS if field != "id"}
+
+
+def keyset_filter(after: Optional[PagePosition]) -> dict:
+    """Return the MongoDB filter fragment selecting items after a position.
+
+    Pages are sorted by (created_at, _id) descending, so the next page holds
+    everything strictly older than the last item, using _id to break ties.
+    """
+    if not after:
+        return {}
+
+    created_at, blog_id = after
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": ObjectId(blog_id)}},
+        ]
+    }
+
+
+def _from_mongo(doc: Optional[dict]) -> Optional[dict]:
+    """Turn a stored document into the repository shape (string ``id``)."""
+    if doc is None:
+        return None
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+
+def _to_mongo(doc: dict) -> dict:
+    stored = {k: v for k, v in doc.items() if k != "id"}
+    stored["_id"] = ObjectId(doc["id"])
+    return stored
+
+
+def _duplicate_field(error: DuplicateKeyError) -> str:
+    key_value = (error.details or {}).get("keyValue") or {}
+    if key_value:
+        return next(iter(key_value))
+    message = str(error)
+    for field in ("email", "username"):
+        if f"{field}_" in message:
+            return field
+    return "unknown"
+
+
+def _blog_filter(blog_id: str, author_id: Optional[str]) -> dict:
+    query = {"_id": ObjectId(blog_id)}
+    if author_id is not None:
+        query["author_id"] = author_id
+    return query
+
+
+class MongoUserRepository(UserRepository):
+    """Users stored in the ``users`` collection through Motor."""
+
+    @property
+    def collection(self):
+        return get_database().users
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        validate_id(user_id)
+        return _from_mongo(await self.collection.find_one({"_id": ObjectId(user_id)}))
+
+    async def get_usernames(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        object_ids = [ObjectId(uid) for uid in set(user_ids) if ObjectId.is_valid(uid)]
+        if not object_ids:
+            return {}
+        cursor = self.collection.find({"_id": {"$in": object_ids}}, {"username": 1})
+        return {str(u["_id"]): u["username"] for u in await cursor.to_list(length=len(object_ids))}
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        return _from_mongo(await self.collection.find_one({"email": email}))
+
+    async def find_by_username(self, username: str) -> Optional[dict]:
+        return _from_mongo(await self.collection.find_one({"username": username}))
+
+    async def find_by_login(self, identifier: str) -> Optional[dict]:
+        return _from_mongo(await self.collection.find_one(
+            {"$or": [{"email": identifier}, {"username": identifier}]}
+        ))
+
+    async def list(self, username: Optional[str] = None, skip: int = 0, limit: int = 10) -> List[dict]:
+        query = {"username": username} if username else {}
+        users = await self.collection.find(query, skip=skip, limit=limit).to_list(length=limit)
+        return [_from_mongo(u) for u in users]
+
+    async def insert(self, user: dict) -> dict:
+        try:
+            await self.collection.insert_one(_to_mongo(user))
+        except DuplicateKeyError as e:
+            raise DuplicateError(_duplicate_field(e))
+        return dict(user)
+
+
+@job("adjust_tag_counts")
+async def adjust_tag_counts(diff: Dict[str, int]) -> None:
+    """Apply a ``{tag: delta}`` diff to the ``tag_counts`` collection.
+
+    A retry after a partial failure can count some tags twice; that is the
+    same drift reconcile_tag_counts repairs.
+    """
+    operations = [UpdateOne({"_id": tag}, {"$inc": {"count": delta}}, upsert=True) for tag, delta in diff.items()]
+    await get_database().tag_counts.bulk_write(operations, ordered=False)
+    # The cached counts were dropped by the write's request, possibly before this ran
+    from app.utils.tag_counts import invalidate_tag_counts
+    invalidate_tag_counts()
+
+
+class MongoBlogRepository(BlogRepository):
+    """Blogs stored in the ``blogs`` collection through Motor.
+
+    Post counts per tag live in ``tag_counts`` as ``{_id: tag, count}``.
+    They are adjusted by a background job after each write rather than in a
+    transaction, so an adjustment that runs out of retries only leaves
+    drift for reconcile_tag_counts to repair.
+    """
+
+    @property
+    def collection(self):
+        return get_database().blogs
+
+    @property
+    def tag_counts_collection(self):
+        return get_database().tag_counts
+
+    async def _adjust_tag_counts(self, diff: Dict[str, int]) -> None:
+        diff = {tag: delta for tag, delta in diff.items() if delta}
+        if diff:
+            # A second round trip the client doesn't need to wait for
+            await enqueue("adjust_tag_counts", diff=diff)
+
+    async def get(self, blog_id: str) -> Optional[dict]:
+        validate_id(blog_id)
+        return _from_mongo(await self.collection.find_one({"_id": ObjectId(blog_id)}))
+
+    async def get_many(self, blog_ids: Iterable[str], summary: bool = False) -> List[dict]:
+        ids = [ObjectId(bid) for bid in set(blog_ids) if ObjectId.is_valid(bid)]
+        if not ids:
+            return []
+        projection = SUMMARY_PROJECTION if summary else None
+        blogs = await self.collection.find({"_id": {"$in": ids}}, projection).to_list(length=len(ids))
+        return [_from_mongo(b) for b in blogs]
+
+    async def list(
+        self,
+        tag: Optional[str] = None,
+        author_id: Optional[str] = None,
+        after: Optional[PagePosition] = None,
+        skip: int = 0,
+        limit: int = 10,
+        summary: bool = False,
+    ) -> List[dict]:
+        query = keyset_filter(after)
+        if tag:
+            query["tags"] = tag
+        if author_id:
+            query["author_id"] = author_id
+
+        projection = SUMMARY_PROJECTION if summary else None
+        blogs = await self.collection.find(
+            query, projection, skip=skip, limit=limit, sort=BLOG_SORT
+        ).to_list(length=limit)
+        return [_from_mongo(b) for b in blogs]
+
+    async def export(self, since: Optional[datetime] = None, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        query = {"updated_at": {"$gte": since}} if since else {}
+        # The cursor fetches batch_size documents per round trip; only one batch is held at a time
+        cursor = self.collection.find(query, sort=EXPORT_SORT, batch_size=batch_size)
+        batch = []
+        async for doc in cursor:
+            batch.append(_from_mongo(doc))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def insert(self, blog: dict) -> dict:
+        await self.collection.insert_one(_to_mongo(blog))
+        await self._adjust_tag_counts(tag_diff((), blog.get("tags")))
+        return dict(blog)
+
+    async def insert_many(self, blogs: List[dict]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = [None] * len(blogs)
+        if not blogs:
+            return errors
+        try:
+            # Unordered, so the server keeps going past individual failures
+            await self.collection.insert_many([_to_mongo(b) for b in blogs], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                errors[error["index"]] = error.get("errmsg", "Write failed")
+
+        diff: Dict[str, int] = {}
+        for blog, error in zip(blogs, errors):
+            if error is None:
+                for tag in tag_diff((), blog.get("tags")):
+                    diff[tag] = diff.get(tag, 0) + 1
+        await self._adjust_tag_counts(diff)
+        return errors
+
+    async def update(self, blog_id: str, fields: dict, author_id: Optional[str] = None) -> Optional[dict]:
+        validate_id(blog_id)
+        if "tags" not in fields:
+            return _from_mongo(await self.collection.find_one_and_update(
+                _blog_filter(blog_id, author_id),
+                {"$set": fields},
+                return_document=ReturnDocument.AFTER,
+            ))
+
+        # The previous tags are needed for the counter diff; the new document follows from $set
+        before = await self.collection.find_one_and_update(
+            _blog_filter(blog_id, author_id),
+            {"$set": fields},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is None:
+            return None
+        await self._adjust_tag_counts(tag_diff(before.get("tags"), fields["tags"]))
+        return _from_mongo({**before, **fields})
+
+    async def delete(self, blog_id: str, author_id: Optional[str] = None) -> bool:
+        validate_id(blog_id)
+        # Returns the tags for the counter diff in the same round trip as the delete
+        deleted = await self.collection.find_one_and_delete(_blog_filter(blog_id, author_id), {"tags": 1})
+        if deleted is None:
+            return False
+        await self._adjust_tag_counts(tag_diff(deleted.get("tags"), ()))
+        return True
+
+    async def tag_counts(self) -> Dict[str, int]:
+        counters = self.tag_counts_collection.find({"count": {"$gt": 0}})
+        return {counter["_id"]: counter["count"] async for counter in counters}
+
+    async def reconcile_tag_counts(self) -> int:
+        # Duplicate tags on one post count once, as they do for the tag filter
+        pipeline = [
+            {"$project": {"tags": {"$setUnion": [{"$ifNull": ["$tags", []]}, []]}}},
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+        ]
+        actual = {group["_id"]: group["count"] async for group in self.collection.aggregate(pipeline)}
+        stored = {counter["_id"]: counter["count"] async for counter in self.tag_counts_collection.find()}
+
+        operations = [
+            UpdateOne({"_id": tag}, {"$set": {"count": count}}, upsert=True)
+            for tag, count in actual.items() if stored.get(tag) != count
+        ]
+        operations += [DeleteOne({"_id": tag}) for tag in stored if tag not in actual]
+        if operations:
+            await self.tag_counts_collection.bulk_write(operations, ordered=False)
+        return len(operations)
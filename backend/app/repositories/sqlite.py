@@ -0,0 +1,357 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+import asyncio
+import json
+import sqlite3
+
+from app.repositories.base import (
+    BlogRepository,
+    DuplicateError,
+    PagePosition,
+    UserRepository,
+    tag_diff,
+    validate_id,
+)
+
+_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL UNIQUE,
+    hashed_password TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS blogs (
+    id TEXT PRIMARY KEY,
+    author_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '[]',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS blogs_created_at ON blogs (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS blogs_author_created_at ON blogs (author_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS blogs_updated_at ON blogs (updated_at, id);
+CREATE TABLE IF NOT EXISTS blog_tags (
+    tag TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    blog_id TEXT NOT NULL,
+    PRIMARY KEY (tag, created_at, blog_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS blog_tags_blog_id ON blog_tags (blog_id);
+CREATE TABLE IF NOT EXISTS tag_counts (
+    tag TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_USER_COLUMNS = ("id", "username", "email", "hashed_password", "created_at")
+_BLOG_COLUMNS = ("id", "author_id", "title", "content", "tags", "created_at", "updated_at")
+# Every stored blog column except content (excerpt and friends live in extra, minus the rendered HTML)
+_SUMMARY_SELECT = (
+    "b.id, b.author_id, b.title, b.tags, b.created_at, b.updated_at, "
+    "json_remove(b.extra, '$.content_html') AS extra"
+)
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width so that text order equals time order
+    return value.strftime(_TIMESTAMP_FORMAT)
+
+
+def _extra(doc: dict, columns) -> str:
+    return json.dumps({k: v for k, v in doc.items() if k not in columns}, default=str)
+
+
+class SQLiteStorage:
+    """A single SQLite connection in WAL mode, used from one worker thread.
+
+    All statements run on a dedicated single-thread executor, which keeps
+    the event loop free and serializes access to the connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    async def run(self, func, *args):
+        """Run func(connection, *args) on the storage thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(self._connect(), *args))
+
+    async def open(self) -> None:
+        await self.run(lambda connection: None)
+
+    async def close(self) -> None:
+        def close(connection):
+            connection.close()
+            self._connection = None
+        if self._connection is not None:
+            await self.run(close)
+        self._executor.shutdown(wait=True)
+
+
+def _user_from_row(row: Optional[sqlite3.Row]) -> Optional[dict]:
+    if row is None:
+        return None
+    user = json.loads(row["extra"])
+    user.update({k: row[k] for k in _USER_COLUMNS})
+    user["created_at"] = datetime.fromisoformat(user["created_at"])
+    return user
+
+
+def _blog_from_row(row: sqlite3.Row) -> dict:
+    blog = json.loads(row["extra"])
+    blog.update({k: row[k] for k in _BLOG_COLUMNS if k in row.keys()})
+    blog["tags"] = json.loads(blog["tags"])
+    blog["created_at"] = datetime.fromisoformat(blog["created_at"])
+    blog["updated_at"] = datetime.fromisoformat(blog["updated_at"])
+    return blog
+
+
+class SQLiteUserRepository(UserRepository):
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+
+    async def _one(self, sql: str, *params) -> Optional[dict]:
+        row = await self.storage.run(lambda c: c.execute(sql, params).fetchone())
+        return _user_from_row(row)
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        validate_id(user_id)
+        return await self._one("SELECT * FROM users WHERE id = ?", user_id)
+
+    async def get_usernames(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        ids = list(set(user_ids))
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        rows = await self.storage.run(lambda c: c.execute(
+            f"SELECT id, username FROM users WHERE id IN ({placeholders})", ids
+        ).fetchall())
+        return {row["id"]: row["username"] for row in rows}
+
+    async def find_by_email(self, email: str) -> Optional[dict]:
+        return await self._one("SELECT * FROM users WHERE email = ?", email)
+
+    async def find_by_username(self, username: str) -> Optional[dict]:
+        return await self._one("SELECT * FROM users WHERE username = ?", username)
+
+    async def find_by_login(self, identifier: str) -> Optional[dict]:
+        return await self._one("SELECT * FROM users WHERE email = ? OR username = ? LIMIT 1", identifier, identifier)
+
+    async def list(self, username: Optional[str] = None, skip: int = 0, limit: int = 10) -> List[dict]:
+        if username:
+            sql, params = "SELECT * FROM users WHERE username = ? LIMIT ? OFFSET ?", (username, limit, skip)
+        else:
+            sql, params = "SELECT * FROM users ORDER BY rowid LIMIT ? OFFSET ?", (limit, skip)
+        rows = await self.storage.run(lambda c: c.execute(sql, params).fetchall())
+        return [_user_from_row(row) for row in rows]
+
+    async def insert(self, user: dict) -> dict:
+        def insert(connection):
+            with connection:
+                connection.execute(
+                    "INSERT INTO users (id, username, email, hashed_password, created_at, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                    (user["id"], user["username"], user["email"], user["hashed_password"],
+                     _timestamp(user["created_at"]), _extra(user, _USER_COLUMNS)),
+                )
+        try:
+            await self.storage.run(insert)
+        except sqlite3.IntegrityError as e:
+            field = str(e).rpartition(".")[2] if "UNIQUE" in str(e) else "unknown"
+            raise DuplicateError(field)
+        return dict(user)
+
+
+class SQLiteBlogRepository(BlogRepository):
+    def __init__(self, storage: SQLiteStorage):
+        self.storage = storage
+
+    async def get(self, blog_id: str) -> Optional[dict]:
+        validate_id(blog_id)
+        row = await self.storage.run(lambda c: c.execute("SELECT * FROM blogs WHERE id = ?", (blog_id,)).fetchone())
+        return _blog_from_row(row) if row else None
+
+    async def get_many(self, blog_ids: Iterable[str], summary: bool = False) -> List[dict]:
+        ids = list(set(blog_ids))
+        if not ids:
+            return []
+        columns = _SUMMARY_SELECT if summary else "b.*"
+        placeholders = ",".join("?" * len(ids))
+        rows = await self.storage.run(lambda c: c.execute(
+            f"SELECT {columns} FROM blogs b WHERE b.id IN ({placeholders})", ids
+        ).fetchall())
+        return [_blog_from_row(row) for row in rows]
+
+    async def list(
+        self,
+        tag: Optional[str] = None,
+        author_id: Optional[str] = None,
+        after: Optional[PagePosition] = None,
+        skip: int = 0,
+        limit: int = 10,
+        summary: bool = False,
+    ) -> List[dict]:
+        conditions, params = [], []
+        columns = _SUMMARY_SELECT if summary else "b.*"
+        if tag:
+            # The blog_tags primary key serves the tag filter and the sort together
+            sql = f"SELECT {columns} FROM blog_tags t JOIN blogs b ON b.id = t.blog_id"
+            conditions.append("t.tag = ?")
+            params.append(tag)
+            order_columns = ("t.created_at", "t.blog_id")
+        else:
+            sql = f"SELECT {columns} FROM blogs b"
+            order_columns = ("b.created_at", "b.id")
+
+        if author_id:
+            conditions.append("b.author_id = ?")
+            params.append(author_id)
+        if after:
+            conditions.append(f"({order_columns[0]}, {order_columns[1]}) < (?, ?)")
+            params.extend([_timestamp(after[0]), after[1]])
+
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order_columns[0]} DESC, {order_columns[1]} DESC LIMIT ? OFFSET ?"
+        params.extend([limit, skip])
+
+        rows = await self.storage.run(lambda c: c.execute(sql, params).fetchall())
+        return [_blog_from_row(row) for row in rows]
+
+    async def export(self, since: Optional[datetime] = None, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        # Keyset batches over the (updated_at, id) index, so no statement stays open between batches
+        position = (_timestamp(since) if since else "", "")
+        while True:
+            rows = await self.storage.run(lambda c: c.execute(
+                "SELECT * FROM blogs WHERE (updated_at, id) > (?, ?) ORDER BY updated_at, id LIMIT ?",
+                (*position, batch_size),
+            ).fetchall())
+            if not rows:
+                return
+            yield [_blog_from_row(row) for row in rows]
+            if len(rows) < batch_size:
+                return
+            position = (rows[-1]["updated_at"], rows[-1]["id"])
+
+    @staticmethod
+    def _adjust_tag_counts(connection, diff: Dict[str, int]) -> None:
+        connection.executemany(
+            "INSERT INTO tag_counts (tag, count) VALUES (?, ?) "
+            "ON CONFLICT (tag) DO UPDATE SET count = count + excluded.count",
+            [(tag, delta) for tag, delta in diff.items() if delta],
+        )
+
+    @classmethod
+    def _write_tags(cls, connection, blog: dict) -> None:
+        # Counters change in the same transaction as the tags, so they can't drift
+        before = [row[0] for row in connection.execute("SELECT tag FROM blog_tags WHERE blog_id = ?", (blog["id"],))]
+        connection.execute("DELETE FROM blog_tags WHERE blog_id = ?", (blog["id"],))
+        connection.executemany(
+            "INSERT OR IGNORE INTO blog_tags (tag, created_at, blog_id) VALUES (?, ?, ?)",
+            [(tag, _timestamp(blog["created_at"]), blog["id"]) for tag in blog.get("tags") or ()],
+        )
+        cls._adjust_tag_counts(connection, tag_diff(before, blog.get("tags")))
+
+    @staticmethod
+    def _write_blog(connection, blog: dict, replace: bool) -> None:
+        verb = "REPLACE" if replace else "INSERT"
+        connection.execute(
+            f"{verb} INTO blogs (id, author_id, title, content, tags, created_at, updated_at, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (blog["id"], blog["author_id"], blog["title"], blog["content"], json.dumps(blog.get("tags") or []),
+             _timestamp(blog["created_at"]), _timestamp(blog["updated_at"]), _extra(blog, _BLOG_COLUMNS)),
+        )
+
+    async def insert(self, blog: dict) -> dict:
+        def insert(connection):
+            with connection:
+                self._write_blog(connection, blog, replace=False)
+                self._write_tags(connection, blog)
+        await self.storage.run(insert)
+        return dict(blog)
+
+    async def insert_many(self, blogs: List[dict]) -> List[Optional[str]]:
+        def insert_many(connection):
+            errors = []
+            # One transaction (and one fsync) for the whole batch
+            with connection:
+                for blog in blogs:
+                    try:
+                        self._write_blog(connection, blog, replace=False)
+                    except sqlite3.IntegrityError as e:
+                        errors.append(str(e))
+                        continue
+                    self._write_tags(connection, blog)
+                    errors.append(None)
+            return errors
+        return await self.storage.run(insert_many)
+
+    async def update(self, blog_id: str, fields: dict, author_id: Optional[str] = None) -> Optional[dict]:
+        validate_id(blog_id)
+
+        def update(connection):
+            with connection:
+                row = connection.execute("SELECT * FROM blogs WHERE id = ?", (blog_id,)).fetchone()
+                if row is None or (author_id is not None and row["author_id"] != author_id):
+                    return None
+                blog = _blog_from_row(row)
+                blog.update(fields)
+                self._write_blog(connection, blog, replace=True)
+                if "tags" in fields:
+                    self._write_tags(connection, blog)
+                return blog
+
+        return await self.storage.run(update)
+
+    async def delete(self, blog_id: str, author_id: Optional[str] = None) -> bool:
+        validate_id(blog_id)
+
+        def delete(connection):
+            with connection:
+                sql, params = "DELETE FROM blogs WHERE id = ?", (blog_id,)
+                if author_id is not None:
+                    sql, params = sql + " AND author_id = ?", (blog_id, author_id)
+                if connection.execute(sql, params).rowcount == 0:
+                    return False
+                tags = [row[0] for row in connection.execute("SELECT tag FROM blog_tags WHERE blog_id = ?", (blog_id,))]
+                connection.execute("DELETE FROM blog_tags WHERE blog_id = ?", (blog_id,))
+                self._adjust_tag_counts(connection, tag_diff(tags, ()))
+                return True
+
+        return await self.storage.run(delete)
+
+    async def tag_counts(self) -> Dict[str, int]:
+        rows = await self.storage.run(lambda c: c.execute("SELECT tag, count FROM tag_counts WHERE count > 0").fetchall())
+        return {row["tag"]: row["count"] for row in rows}
+
+    async def reconcile_tag_counts(self) -> int:
+        def reconcile(connection):
+            with connection:
+                actual = dict(connection.execute("SELECT tag, COUNT(*) FROM blog_tags GROUP BY tag").fetchall())
+                stored = dict(connection.execute("SELECT tag, count FROM tag_counts").fetchall())
+                wrong = [tag for tag in actual.keys() | stored.keys() if actual.get(tag) != stored.get(tag)]
+                connection.execute("DELETE FROM tag_counts")
+                connection.executemany("INSERT INTO tag_counts (tag, count) VALUES (?, ?)", actual.items())
+                return len(wrong)
+
+        return await self.storage.run(reconcile)
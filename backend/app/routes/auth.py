@@ -2,101 +2,73 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request, Header,
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Optional
 from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime
 
-from app.database import get_database
-from app.models.user import User, UserOut, UserCreate, UserInDB
-from app.core.auth import (
+from app.log import get_logger
+from app.models.user import UserCreate, UserResponse
+from app.utils.auth import (
     authenticate_user,
     create_access_token,
     get_current_user,
-    get_password_hash,
+    get_password_hash_async,
 )
-from pymongo.database import Database
-from pymongo.errors import DuplicateKeyError
+from app.repositories import DuplicateError, UserRepository, get_user_repository, new_id
+from app.utils.rate_limit import enforce_rate_limit
 
 router = APIRouter()
+logger = get_logger(__name__)
 
-@router.post("/register", response_model=UserOut)
+@router.post("/register", response_model=UserResponse)
 async def register(
     user_create: UserCreate, 
     request: Request,
-    db: Database = Depends(get_database),
+    users: UserRepository = Depends(get_user_repository),
     x_internal_request: Optional[str] = Header(None)
 ):
     """
     Register a new user
     """
     # Log the registration attempt
-    print(f"Registration attempt from {request.client.host}: {user_create.email}")
-    print(f"Headers: {request.headers}")
+    logger.info("Registration attempt", extra={"fields": {
+        "email": user_create.email,
+        "internal": x_internal_request == "true",
+    }})
     
-    # If this is an internal request, we can skip some validation
-    is_internal = x_internal_request == "true"
-    print(f"Is internal request: {is_internal}")
+    # Hashing is CPU bound, so floods are turned away before it
+    enforce_rate_limit("register", request, user_create.email)
 
-    # Check if email already exists
-    existing_user = await db.users.find_one({"email": user_create.email})
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Validate and create user
+    # Validate and create user; the unique email and username indexes reject duplicates
     try:
-        # Hash the password
-        hashed_password = get_password_hash(user_create.password)
+        # Hash the password off the event loop
+        hashed_password = await get_password_hash_async(user_create.password)
         
-        # Create UserInDB instance
-        user_in_db = UserInDB(
-            **user_create.dict(), 
-            hashed_password=hashed_password
-        )
-        
-        # Remove plain password before storing
-        user_dict = user_in_db.dict()
-        del user_dict["password"]  # Remove plain password
+        # Store everything except the plain password
+        user_dict = {
+            "id": new_id(),
+            "username": user_create.username,
+            "email": user_create.email,
+            "hashed_password": hashed_password,
+            "created_at": datetime.utcnow()
+        }
         
-        # Insert into the database
-        result = await db.users.insert_one(user_dict)
+        # Insert into storage
+        created_user = await users.insert(user_dict)
+        del created_user["hashed_password"]  # Don't return the hashed password
         
-        # Return created user
-        created_user = await db.users.find_one({"_id": result.inserted_id})
-        if created_user:
-            # Convert _id to string
-            created_user["id"] = str(created_user["_id"])
-            del created_user["_id"]
-            del created_user["hashed_password"]  # Don't return the hashed password
-            
-            # Log success
-            print(f"User registered successfully: {created_user['email']}")
-            
-            # Create response
-            response = JSONResponse(
-                status_code=status.HTTP_201_CREATED,
-                content=created_user
-            )
-            
-            # Add CORS headers if this is not an internal request
-            if not is_internal:
-                response.headers["Access-Control-Allow-Origin"] = "https://qblog-nrzw.vercel.app"
-                response.headers["Access-Control-Allow-Methods"] = "GET,OPTIONS,PATCH,DELETE,POST,PUT"
-                response.headers["Access-Control-Allow-Headers"] = "X-CSRF-Token, X-Requested-With, Accept, Accept-Version, Content-Length, Content-MD5, Content-Type, Date, X-Api-Version, Authorization, Origin"
-                
-            return response
+        # Log success
+        logger.info("User registered", extra={"fields": {"user_id": created_user["id"]}})
         
-        # If we got here, something went wrong
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error creating user"
+        # CORS headers are added by CORSMiddleware
+        return JSONResponse(
+            status_code=status.HTTP_201_CREATED,
+            content=jsonable_encoder(created_user)
         )
-    except DuplicateKeyError:
-        # This could happen if there's a race condition
+    except DuplicateError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail="Username already taken" if e.field == "username" else "Email already registered"
         )
     except ValueError as e:
         # This would be raised by the model validation
@@ -106,9 +78,7 @@ async def register(
         )
     except Exception as e:
         # Log the error
-        print(f"Error during registration: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error during registration")
         
         # Return a generic error
         raise HTTPException(
@@ -118,14 +88,17 @@ async def register(
 
 @router.post("/login")
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Database = Depends(get_database)
+    users: UserRepository = Depends(get_user_repository)
 ):
     """
     Get access token for user
     """
+    enforce_rate_limit("login", request, form_data.username)
+    
     # Try to authenticate the user
-    user = await authenticate_user(form_data.username, form_data.password, db)
+    user = await authenticate_user(form_data.username, form_data.password, users)
     if not user:
         # If authentication fails
         raise HTTPException(
@@ -140,8 +113,8 @@ async def login(
     # Return the token
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.get("/me", response_model=UserOut)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+@router.get("/me", response_model=UserResponse)
+async def read_users_me(current_user: dict = Depends(get_current_user)):
     """
     Get current user information
     """
@@ -154,7 +127,7 @@ async def auth_fallback(
     username: str = Query(None),
     email: str = Query(None),
     password: str = Query(None),
-    db: Database = Depends(get_database)
+    users: UserRepository = Depends(get_user_repository)
 ):
     """
     Fallback endpoint that handles authentication via GET requests
@@ -166,19 +139,15 @@ async def auth_fallback(
     - email: Email for registration
     - password: Password for login or registration
     """
-    print(f"Fallback auth request: {mode} from {request.client.host}")
-    print(f"Request headers: {request.headers}")
+    logger.info("Fallback auth request", extra={"fields": {"mode": mode}})
+    enforce_rate_limit("fallback", request, email or username)
     
-    # Create response with CORS headers
+    # Create response (CORS headers are added by CORSMiddleware)
     async def create_cors_response(content, status_code=200):
-        response = JSONResponse(
-            content=content,
+        return JSONResponse(
+            content=jsonable_encoder(content),
             status_code=status_code
         )
-        response.headers["Access-Control-Allow-Origin"] = "https://qblog-nrzw.vercel.app"
-        response.headers["Access-Control-Allow-Methods"] = "GET,OPTIONS,PATCH,DELETE,POST,PUT"
-        response.headers["Access-Control-Allow-Headers"] = "X-CSRF-Token, X-Requested-With, Accept, Accept-Version, Content-Length, Content-MD5, Content-Type, Date, X-Api-Version, Authorization, Origin"
-        return response
     
     try:
         if mode == "register":
@@ -189,53 +158,36 @@ async def auth_fallback(
                     status.HTTP_400_BAD_REQUEST
                 )
             
-            # Check if email already exists
-            existing_user = await db.users.find_one({"email": email})
-            if existing_user:
-                return await create_cors_response(
-                    {"detail": "Email already registered"},
-                    status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Check if username already exists
-            existing_user = await db.users.find_one({"username": username})
-            if existing_user:
-                return await create_cors_response(
-                    {"detail": "Username already taken"},
-                    status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Create user
-            hashed_password = get_password_hash(password)
+            # Create user; the unique indexes reject a taken email or username
+            hashed_password = await get_password_hash_async(password)
             
             user_dict = {
+                "id": new_id(),
                 "username": username,
                 "email": email,
                 "hashed_password": hashed_password,
                 "created_at": datetime.utcnow()
             }
             
-            # Insert into the database
-            result = await db.users.insert_one(user_dict)
+            # Insert into storage
+            try:
+                created_user = await users.insert(user_dict)
+            except DuplicateError as e:
+                return await create_cors_response(
+                    {"detail": "Username already taken" if e.field == "username" else "Email already registered"},
+                    status.HTTP_400_BAD_REQUEST
+                )
             
             # Prepare response
-            created_user = await db.users.find_one({"_id": result.inserted_id})
-            if created_user:
-                response_data = {
-                    "id": str(created_user["_id"]),
-                    "username": created_user["username"],
-                    "email": created_user["email"],
-                    "created_at": created_user["created_at"]
-                }
-                
-                print(f"User registered successfully via fallback: {email}")
-                return await create_cors_response(response_data, status.HTTP_201_CREATED)
+            response_data = {
+                "id": created_user["id"],
+                "username": created_user["username"],
+                "email": created_user["email"],
+                "created_at": created_user["created_at"]
+            }
             
-            # If we got here, something went wrong
-            return await create_cors_response(
-                {"detail": "Error creating user"},
-                status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            logger.info("User registered via fallback", extra={"fields": {"user_id": response_data["id"]}})
+            return await create_cors_response(response_data, status.HTTP_201_CREATED)
             
         elif mode == "login":
             # Validate inputs
@@ -246,7 +198,7 @@ async def auth_fallback(
                 )
             
             # Try to authenticate the user
-            user = await authenticate_user(username, password, db)
+            user = await authenticate_user(username, password, users)
             if not user:
                 return await create_cors_response(
                     {"detail": "Incorrect email or password"},
@@ -269,9 +221,7 @@ async def auth_fallback(
             )
     
     except Exception as e:
-        print(f"Error in fallback auth: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error in fallback auth")
         
         return await create_cors_response(
             {"detail": f"Internal server error: {str(e)}"},
@@ -1,39 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
-from datetime import datetime
-from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, Header
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import AsyncIterator, List, Literal, Optional, Union
+from datetime import datetime, timezone
 
-from app.models.blog import BlogCreate, BlogUpdate, BlogResponse
+from app.models.blog import BlogCreate, BlogUpdate, BlogHTMLResponse, BlogResponse, BlogSearchResult, BlogSummary, TagCount
+from app.repositories import BlogRepository, InvalidIdError, get_blog_repository, new_id
 from app.utils.auth import get_current_user
-from app.database import get_database
+from app.utils.authors import resolve_author, resolve_authors, remember_author
+from app.utils.bulk import (
+    BULK_BATCH_SIZE,
+    BulkFormatError,
+    describe_error,
+    iter_bulk_items,
+    validate_blog_item,
+)
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.blog_cache import (
+    CachedBlog,
+    cache_blog,
+    cache_generation,
+    etag_matches,
+    get_cached_blog,
+    invalidate_blog,
+)
+from app.jobs import enqueue
+from app.utils.compression import compressed_response
+from app.utils.list_cache import LIST_CACHE_CONTROL, get_list, invalidate_lists
+from app.utils.rendering import attach_html, rendered_fields
+from app.utils.search import SEARCH_ENABLED, SearchIndexUnavailable, index_blog, search, unindex_blog
+from app.utils.serialization import (
+    ORJSONResponse,
+    blog_serializer,
+    html_blog_serializer,
+    search_serializer,
+    summary_serializer,
+)
+from app.utils.single_flight import SingleFlight
+from app.utils.summary import summarize
+from app.utils.tag_counts import get_tag_counts, invalidate_tag_counts
+from app.log import get_logger
 
 router = APIRouter()
+logger = get_logger(__name__)
+
+# Concurrent cache misses for the same post share one read
+_blog_loads = SingleFlight("blogs")
 
 
 @router.post("/", response_model=BlogResponse, status_code=status.HTTP_201_CREATED)
-async def create_blog(blog: BlogCreate, current_user: dict = Depends(get_current_user)):
+async def create_blog(
+    blog: BlogCreate,
+    current_user: dict = Depends(get_current_user),
+    blogs: BlogRepository = Depends(get_blog_repository)
+):
     """Create a new blog post."""
-    db = get_database()
-    
     # Create blog object
-    blog_id = ObjectId()
+    blog_id = new_id()
     now = datetime.utcnow()
     
     blog_in_db = {
-        "_id": blog_id,
+        "id": blog_id,
         "title": blog.title,
         "content": blog.content,
         "tags": blog.tags,
         "author_id": current_user["id"],
         "created_at": now,
-        "updated_at": now
+        "updated_at": now,
+        **summarize(blog.content),
+        **rendered_fields(blog.content)
     }
     
-    await db.blogs.insert_one(blog_in_db)
+    await blogs.insert(blog_in_db)
+    index_blog(blog_in_db)
+    invalidate_lists()
+    remember_author(current_user["id"], current_user["username"])
+    if blog.tags:
+        invalidate_tag_counts()
     
     # Add author username for response
     blog_response = {
-        "id": str(blog_id),
+        "id": blog_id,
         "title": blog.title,
         "content": blog.content,
         "tags": blog.tags,
@@ -43,68 +90,261 @@ async def create_blog(blog: BlogCreate, current_user: dict = Depends(get_current
         "updated_at": now
     }
     
-    return blog_response
+    return ORJSONResponse(blog_serializer.dump(blog_response), status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/bulk")
+async def bulk_create_blogs(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    blogs: BlogRepository = Depends(get_blog_repository)
+):
+    """Create many blog posts in one request.
+    
+    The body is a JSON array of blogs or, with ``Content-Type:
+    application/x-ndjson``, one blog per line (streamed, so it can be
+    arbitrarily long). Items are validated and written ``BULK_BATCH_SIZE``
+    at a time; one bad item doesn't stop the others. The response lists
+    the new id or the error for every item, by position in the input.
+    """
+    results = []
+    created = 0
+    pending = []
+    
+    async def flush():
+        nonlocal created
+        errors = await blogs.insert_many([doc for _, doc in pending])
+        for (index, doc), error in zip(pending, errors):
+            if error is None:
+                created += 1
+                index_blog(doc)
+                results.append({"index": index, "id": doc["id"]})
+            else:
+                results.append({"index": index, "detail": error})
+        pending.clear()
+    
+    try:
+        async for index, item in iter_bulk_items(request):
+            try:
+                blog = validate_blog_item(item)
+            except ValidationError as e:
+                results.append({"index": index, "detail": describe_error(e)})
+                continue
+            
+            now = datetime.utcnow()
+            pending.append((index, {
+                "id": new_id(),
+                "title": blog.title,
+                "content": blog.content,
+                "tags": blog.tags,
+                "author_id": current_user["id"],
+                "created_at": now,
+                "updated_at": now,
+                **summarize(blog.content),
+                **rendered_fields(blog.content)
+            }))
+            if len(pending) >= BULK_BATCH_SIZE:
+                await flush()
+        
+        if pending:
+            await flush()
+    except BulkFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    remember_author(current_user["id"], current_user["username"])
+    if created:
+        invalidate_lists()
+        invalidate_tag_counts()
+    
+    # Validation failures are recorded before the batch they were read with is written
+    results.sort(key=lambda result: result["index"])
+    # Everything in the summary is plain JSON already, so skip jsonable_encoder
+    return ORJSONResponse({"created": created, "failed": len(results) - created, "results": results})
 
 
-@router.get("/", response_model=List[BlogResponse])
+@router.get("/", response_model=Union[List[BlogResponse], List[BlogHTMLResponse], List[BlogSummary]])
 async def get_blogs(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     tag: Optional[str] = None,
-    author_id: Optional[str] = None
+    author_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+    output_format: Literal["markdown", "html"] = Query("markdown", alias="format"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    blogs: BlogRepository = Depends(get_blog_repository)
 ):
-    """Get blog posts with optional filtering."""
-    db = get_database()
+    """Get blog posts with optional filtering.
     
-    # Build query filter
-    query = {}
-    if tag:
-        query["tags"] = tag
-    if author_id:
-        query["author_id"] = author_id
+    Pass the ``X-Next-Cursor`` header of a page back as ``cursor`` to fetch
+    the next one; ``skip`` is still honoured for older clients. With
+    ``view=summary`` posts come without ``content`` but with an excerpt,
+    word count and reading time, which is all a listing needs. With
+    ``format=html`` full posts also carry ``content_html``, the sanitized
+    rendering of their Markdown; summaries have no content to render, so
+    combining it with ``view=summary`` is a 400.
     
-    # Find blogs with pagination - avoid direct cursor usage
+    Pages are cached serialized (and compressed) per query; see
+    ``app.utils.list_cache`` for how long they may be served stale.
+    """
     try:
-        # Add sorting in the find operation
-        sort_option = [("created_at", -1)]
-        blogs = await db.blogs.find(query, skip=skip, limit=limit, sort=sort_option).to_list(length=limit)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    summary = view == "summary"
+    html = output_format == "html"
+    if summary and html:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format=html is not available with view=summary"
+        )
+    
+    if after:
+        skip = 0
+    
+    async def load():
+        # Find blogs with pagination, newest first
+        page = await blogs.list(tag=tag, author_id=author_id, after=after, skip=skip, limit=limit, summary=summary)
         
-        # Get author usernames
-        author_ids = {blog["author_id"] for blog in blogs}
-        authors = {}
+        next_cursor = None
+        if len(page) == limit:
+            last = page[-1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
         
-        if author_ids:
-            # Use a different approach to fetch authors
-            for aid in author_ids:
-                author = await db.users.find_one({"_id": ObjectId(aid)})
-                if author:
-                    authors[str(author["_id"])] = author["username"]
+        # Get author usernames in one batched lookup
+        authors = await resolve_authors(blog["author_id"] for blog in page)
         
         # Format response
-        formatted_blogs = []
-        for blog in blogs:
-            blog["id"] = str(blog["_id"])
-            del blog["_id"]
+        for blog in page:
             blog["author_username"] = authors.get(blog["author_id"], "Unknown")
-            formatted_blogs.append(blog)
+            if html:
+                attach_html(blog)
         
-        return formatted_blogs
+        # Documents come straight from storage, so serialize without re-validating
+        if summary:
+            serializer = summary_serializer
+        else:
+            serializer = html_blog_serializer if html else blog_serializer
+        return serializer.dump_many(page), next_cursor
+    
+    try:
+        cached = await get_list((summary, html, limit, tag or None, author_id or None, after or skip), load)
     except Exception as e:
-        print(f"Error fetching blogs: {e}")
+        logger.exception("Error fetching blogs")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database error: {str(e)}"
         )
+    
+    headers = {"ETag": cached.etag, "Cache-Control": LIST_CACHE_CONTROL}
+    if cached.next_cursor:
+        headers["X-Next-Cursor"] = cached.next_cursor
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return compressed_response(cached.body, accept_encoding, headers, cached.compressed)
+
+
+async def _export_lines(blogs: BlogRepository, since: Optional[datetime], batch_size: int) -> AsyncIterator[bytes]:
+    """Yield one NDJSON chunk per storage batch, with authors resolved per batch."""
+    try:
+        async for batch in blogs.export(since=since, batch_size=batch_size):
+            authors = await resolve_authors(blog["author_id"] for blog in batch)
+            lines = []
+            for blog in batch:
+                blog["author_username"] = authors.get(blog["author_id"], "Unknown")
+                lines.append(blog_serializer.dump(blog))
+            yield b"\n".join(lines) + b"\n"
+    except Exception:
+        # The status line has already been sent; the client sees a truncated stream
+        logger.exception("Error exporting blogs")
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_blogs(
+    since: Optional[datetime] = None,
+    batch_size: int = Query(500, ge=1, le=5000),
+    blogs: BlogRepository = Depends(get_blog_repository)
+):
+    """Stream every blog as newline-delimited JSON, oldest update first.
+    
+    Pass the ``updated_at`` of the last exported line as ``since`` to fetch
+    only what changed afterwards. Blogs are read ``batch_size`` at a time,
+    so memory use does not grow with the number of posts.
+    """
+    if since is not None and since.tzinfo is not None:
+        # Timestamps are stored as naive UTC
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    return StreamingResponse(
+        _export_lines(blogs, since, batch_size),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/tags", response_model=List[TagCount])
+async def get_tags(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    blogs: BlogRepository = Depends(get_blog_repository)
+):
+    """Get every tag with its number of posts, most used first.
+    
+    Counts are kept up to date on each write, so this never scans the blogs.
+    """
+    counts = await get_tag_counts(blogs)
+    return ORJSONResponse(counts[:limit] if limit else counts)
 
 
-@router.get("/{blog_id}", response_model=BlogResponse)
-async def get_blog(blog_id: str):
-    """Get a specific blog post by ID."""
-    db = get_database()
+@router.get("/search", response_model=List[BlogSearchResult])
+async def search_blogs(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0, le=1000),
+    limit: int = Query(10, ge=1, le=100),
+    blogs: BlogRepository = Depends(get_blog_repository)
+):
+    """Full-text search over titles and content, best match first.
+    
+    Results are summaries (as with ``view=summary``) plus their BM25
+    ``score``. Any of the words may match; title words weigh more.
+    """
+    if not SEARCH_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search is disabled"
+        )
     
     try:
-        blog = await db.blogs.find_one({"_id": ObjectId(blog_id)})
-    except:
+        page = await search(blogs, q, skip=skip, limit=limit)
+        authors = await resolve_authors(blog["author_id"] for blog in page)
+        for blog in page:
+            blog["author_username"] = authors.get(blog["author_id"], "Unknown")
+        return ORJSONResponse(search_serializer.dump_many(page))
+    except SearchIndexUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search index is not ready"
+        )
+    except Exception as e:
+        logger.exception("Error searching blogs")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Search error: {str(e)}"
+        )
+
+
+async def _load_blog(blogs: BlogRepository, blog_id: str, html: bool, generation: int) -> CachedBlog:
+    """Read a blog and its author, then serialize and cache the response."""
+    try:
+        blog = await blogs.get(blog_id)
+    except InvalidIdError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid blog ID format"
@@ -117,91 +357,140 @@ async def get_blog(blog_id: str):
         )
     
     # Get author username
-    author = await db.users.find_one({"_id": ObjectId(blog["author_id"])})
-    author_username = author["username"] if author else "Unknown"
+    blog["author_username"] = await resolve_author(blog["author_id"])
     
-    # Format response
-    blog["id"] = str(blog["_id"])
-    del blog["_id"]
-    blog["author_username"] = author_username
+    if html and attach_html(blog):
+        # Written before rendering existed (or by an older renderer): store it for next time
+        await enqueue("store_rendered_html", blog_id=blog_id,
+                      content_html=blog["content_html"], content_hash=blog["content_hash"])
     
-    return blog
+    return cache_blog(blog, generation, html)
 
 
-@router.put("/{blog_id}", response_model=BlogResponse)
-async def update_blog(blog_id: str, blog_update: BlogUpdate, current_user: dict = Depends(get_current_user)):
-    """Update a blog post."""
-    db = get_database()
+@router.get("/{blog_id}", response_model=Union[BlogResponse, BlogHTMLResponse])
+async def get_blog(
+    blog_id: str,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    output_format: Literal["markdown", "html"] = Query("markdown", alias="format"),
+    blogs: BlogRepository = Depends(get_blog_repository)
+):
+    """Get a specific blog post by ID.
     
-    try:
-        blog = await db.blogs.find_one({"_id": ObjectId(blog_id)})
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid blog ID format"
+    Hot posts are served pre-serialized (and pre-compressed, per encoding)
+    from memory and answer ``If-None-Match`` with 304 when the client
+    already has the current version. On a cache miss, concurrent requests
+    for the same post share one read, so a post going viral right after
+    an edit costs one query rather than one per request.
+    With ``format=html`` the post also carries ``content_html``: its Markdown
+    rendered and sanitized when it was written, so views never render it.
+    """
+    html = output_format == "html"
+    cached = get_cached_blog(blog_id, html)
+    if cached is None:
+        # The generation is part of the key, so nobody joins a read that started before a write
+        generation = cache_generation()
+        cached = await _blog_loads.do(
+            (blog_id, html, generation), lambda: _load_blog(blogs, blog_id, html, generation)
         )
     
-    if not blog:
-        raise HTTPException(
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return compressed_response(cached.body, accept_encoding, headers, cached.compressed)
+
+
+async def _write_refused(blogs: BlogRepository, blog_id: str, detail: str) -> HTTPException:
+    """Explain why a write filtered on the author matched nothing.
+    
+    Only runs on the failure path, so successful writes stay one round trip.
+    """
+    if await blogs.get(blog_id) is None:
+        return HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Blog not found"
         )
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=detail
+    )
+
+
+@router.put("/{blog_id}", response_model=BlogResponse)
+async def update_blog(
+    blog_id: str,
+    blog_update: BlogUpdate,
+    current_user: dict = Depends(get_current_user),
+    blogs: BlogRepository = Depends(get_blog_repository)
+):
+    """Update a blog post.
     
-    # Check if user is the author
-    if blog["author_id"] != current_user["id"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only update your own blogs"
-        )
-    
+    The author check is part of the update itself, so there is no window
+    between checking ownership and writing.
+    """
     # Update fields that are provided
     update_data = {k: v for k, v in blog_update.dict(exclude_unset=True).items()}
     if update_data:
         update_data["updated_at"] = datetime.utcnow()
-        
-        await db.blogs.update_one(
-            {"_id": ObjectId(blog_id)},
-            {"$set": update_data}
+        if update_data.get("content") is not None:
+            update_data.update(summarize(update_data["content"]))
+            update_data.update(rendered_fields(update_data["content"]))
+    
+    try:
+        if update_data:
+            blog = await blogs.update(blog_id, update_data, author_id=current_user["id"])
+        else:
+            # Nothing to write: return the post if the user may edit it
+            blog = await blogs.get(blog_id)
+            if blog and blog["author_id"] != current_user["id"]:
+                blog = None
+    except InvalidIdError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid blog ID format"
         )
     
-    # Get updated blog
-    updated_blog = await db.blogs.find_one({"_id": ObjectId(blog_id)})
+    if blog is None:
+        raise await _write_refused(blogs, blog_id, "You can only update your own blogs")
+    
+    if update_data:
+        invalidate_blog(blog_id)
+        invalidate_lists()
+        if "tags" in update_data:
+            invalidate_tag_counts()
+        if "title" in update_data or "content" in update_data:
+            index_blog(blog)
+    
+    remember_author(current_user["id"], current_user["username"])
     
     # Format response
-    updated_blog["id"] = str(updated_blog["_id"])
-    del updated_blog["_id"]
-    updated_blog["author_username"] = current_user["username"]
+    blog["author_username"] = current_user["username"]
     
-    return updated_blog
+    return ORJSONResponse(blog_serializer.dump(blog))
 
 
 @router.delete("/{blog_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_blog(blog_id: str, current_user: dict = Depends(get_current_user)):
-    """Delete a blog post."""
-    db = get_database()
-    
+async def delete_blog(
+    blog_id: str,
+    current_user: dict = Depends(get_current_user),
+    blogs: BlogRepository = Depends(get_blog_repository)
+):
+    """Delete a blog post (only the author's own)."""
     try:
-        blog = await db.blogs.find_one({"_id": ObjectId(blog_id)})
-    except:
+        deleted = await blogs.delete(blog_id, author_id=current_user["id"])
+    except InvalidIdError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid blog ID format"
         )
     
-    if not blog:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Blog not found"
-        )
-    
-    # Check if user is the author
-    if blog["author_id"] != current_user["id"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You can only delete your own blogs"
-        )
+    if not deleted:
+        raise await _write_refused(blogs, blog_id, "You can only delete your own blogs")
     
-    # Delete the blog
-    await db.blogs.delete_one({"_id": ObjectId(blog_id)})
+    invalidate_blog(blog_id)
+    invalidate_lists()
+    invalidate_tag_counts()
+    unindex_blog(blog_id)
     
-    return None 
\ No newline at end of file
+    return None
@@ -1,58 +1,43 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
-from bson import ObjectId
 
 from app.models.user import UserResponse
-from app.database import get_database
+from app.repositories import InvalidIdError, UserRepository, get_user_repository
+from app.utils.auth import lookup_user
+from app.utils.serialization import ORJSONResponse, user_serializer
+from app.log import get_logger
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
     username: Optional[str] = None,
     skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    users: UserRepository = Depends(get_user_repository)
 ):
     """Get users with optional filtering by username."""
-    db = get_database()
-    
-    # Build query filter
-    query = {}
-    if username:
-        query["username"] = username
-    
     try:
-        # Find users with pagination - direct to_list approach instead of cursor
-        users = await db.users.find(query, skip=skip, limit=limit).to_list(length=limit)
-        
-        # Format response
-        formatted_users = []
-        for user in users:
-            formatted_user = {
-                "id": str(user["_id"]),
-                "username": user["username"],
-                "email": user["email"],
-                "created_at": user["created_at"]
-            }
-            formatted_users.append(formatted_user)
+        # Find users with pagination
+        page = await users.list(username=username, skip=skip, limit=limit)
         
-        return formatted_users
+        # Only the UserResponse fields are written, so hashed_password never leaves
+        return ORJSONResponse(user_serializer.dump_many(page))
     except Exception as e:
-        print(f"Error fetching users: {e}")
+        logger.exception("Error fetching users")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Database error: {str(e)}"
         )
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: str):
+async def get_user(user_id: str, users: UserRepository = Depends(get_user_repository)):
     """Get a specific user by ID."""
-    db = get_database()
-    
     try:
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
-    except Exception as e:
-        print(f"Error with user ID format: {e}")
+        user = await lookup_user(users, user_id)
+    except InvalidIdError:
+        logger.info("Invalid user ID format", extra={"fields": {"user_id": user_id}})
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid user ID format"
@@ -64,12 +49,4 @@ async def get_user(user_id: str):
             detail="User not found"
         )
     
-    # Format response
-    user_response = {
-        "id": str(user["_id"]),
-        "username": user["username"],
-        "email": user["email"],
-        "created_at": user["created_at"]
-    }
-    
-    return user_response 
\ No newline at end of file
+    return ORJSONResponse(user_serializer.dump(user)) 
\ No newline at end of file
@@ -2,6 +2,9 @@
 from app.utils.auth import (
     verify_password,
     get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+    authenticate_user,
     create_access_token,
     get_current_user,
 ) 
\ No newline at end of file
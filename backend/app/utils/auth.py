@@ -1,14 +1,16 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
 import os
+import time
 from app.models.user import TokenData
-from app.database import get_database
+from app.repositories import InvalidIdError, UserRepository, get_user_repository
+from app.utils.cache import LRUCache
+from app.utils.single_flight import SingleFlight
 from dotenv import load_dotenv
-from bson import ObjectId
 
 load_dotenv()
 
@@ -17,22 +19,132 @@ SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key_for_development")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing executor configurations ("thread" or "process")
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_MAX_WORKERS = int(os.getenv("PASSWORD_HASH_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Token and principal cache configurations
+AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+token_cache = LRUCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+principal_cache = LRUCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Concurrent reads of the same user (a cold principal cache, a popular profile) share one query
+_user_lookups = SingleFlight("users")
+
+# passlib and jose are imported on first use: most requests need neither,
+# and importing them up front adds to every serverless cold start
+_pwd_context = None
+
+
+def _get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
 
 def verify_password(plain_password, hashed_password):
     """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password):
     """Generate a password hash."""
-    return pwd_context.hash(password)
+    return _get_pwd_context().hash(password)
+
+
+# bcrypt is CPU bound, so it runs on a bounded executor instead of the event loop
+_hash_executor: Optional[Executor] = None
+_hash_semaphore: Optional[asyncio.Semaphore] = None
+_hash_stats = {"waiting": 0, "in_flight": 0, "completed": 0, "max_waiting": 0}
+
+
+def _get_hash_executor() -> Executor:
+    global _hash_executor
+    if _hash_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_MAX_WORKERS)
+        else:
+            _hash_executor = ThreadPoolExecutor(
+                max_workers=PASSWORD_HASH_MAX_WORKERS,
+                thread_name_prefix="password-hash",
+            )
+    return _hash_executor
+
+
+async def _run_password_hashing(func, *args):
+    """Run a hashing function on the executor, capping how many run at once."""
+    global _hash_semaphore
+    if _hash_semaphore is None:
+        _hash_semaphore = asyncio.Semaphore(PASSWORD_HASH_MAX_WORKERS)
+    
+    _hash_stats["waiting"] += 1
+    _hash_stats["max_waiting"] = max(_hash_stats["max_waiting"], _hash_stats["waiting"])
+    try:
+        await _hash_semaphore.acquire()
+    finally:
+        _hash_stats["waiting"] -= 1
+    
+    _hash_stats["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        _hash_stats["in_flight"] -= 1
+        _hash_stats["completed"] += 1
+        _hash_semaphore.release()
+
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a password against a hash without blocking the event loop."""
+    return await _run_password_hashing(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    """Generate a password hash without blocking the event loop."""
+    return await _run_password_hashing(get_password_hash, password)
+
+
+def password_hashing_stats() -> dict:
+    """Return queue depth and throughput counters for password hashing."""
+    return {
+        "executor": PASSWORD_HASH_EXECUTOR,
+        "max_workers": PASSWORD_HASH_MAX_WORKERS,
+        **_hash_stats,
+    }
+
+
+def shutdown_password_hashing():
+    """Stop the hashing executor, waiting for queued work to finish."""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=True)
+        _hash_executor = None
+
+
+async def authenticate_user(username: str, password: str, users: UserRepository):
+    """Return the user matching an email or username and password, or None."""
+    user = await users.find_by_login(username)
+    if not user:
+        return None
+    
+    if not await verify_password_async(password, user["hashed_password"]):
+        return None
+    
+    del user["hashed_password"]
+    return user
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT token."""
+    from jose import jwt
+    
     to_encode = data.copy()
     
     if expires_delta:
@@ -45,8 +157,46 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Get the current authenticated user from the token."""
+def _decode_token(token: str) -> tuple:
+    """Return (user_id, expires_at) for a token, using the decoded-token cache."""
+    from jose import JWTError, jwt
+    
+    signing_input, _, signature = token.rpartition(".")
+    
+    if AUTH_CACHE_ENABLED:
+        cached = token_cache.get(signature)
+        # The signature alone is not trusted; the signed part must match as well
+        if cached is not None and cached[0] == signing_input and cached[2] > time.time():
+            return cached[1], cached[2]
+    
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    user_id = payload.get("sub")
+    expires_at = payload.get("exp")
+    if user_id is None:
+        raise JWTError("Token has no subject")
+    
+    if AUTH_CACHE_ENABLED and expires_at is not None:
+        ttl = min(AUTH_CACHE_TTL, expires_at - time.time())
+        if ttl > 0:
+            token_cache.set(signature, (signing_input, user_id, expires_at), ttl=ttl)
+    
+    return user_id, expires_at
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    users: UserRepository = Depends(get_user_repository),
+):
+    """Get the current authenticated user from the token.
+    
+    Decoded tokens and user principals are cached for AUTH_CACHE_TTL seconds,
+    so repeated requests with the same token skip both JWT verification and
+    the users lookup. Nothing invalidates a cached principal: a user record
+    changed or deleted in storage is seen here after at most AUTH_CACHE_TTL
+    seconds (the API itself never updates or deletes users).
+    """
+    from jose import JWTError
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -55,25 +205,47 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     
     try:
         # Decode the JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        
+        user_id, _ = _decode_token(token)
         token_data = TokenData(user_id=user_id)
     except JWTError:
         raise credentials_exception
     
-    # Get the user from the database
-    db = get_database()
-    user = await db.users.find_one({"_id": ObjectId(token_data.user_id)})
+    if AUTH_CACHE_ENABLED:
+        user = principal_cache.get(token_data.user_id)
+        if user is not None:
+            return dict(user)
+    
+    # Get the user from storage
+    try:
+        user = await lookup_user(users, token_data.user_id)
+    except InvalidIdError:
+        raise credentials_exception
     
     if user is None:
         raise credentials_exception
     
-    # Convert ObjectId to string for the response
-    user["id"] = str(user["_id"])
-    del user["_id"]
     del user["hashed_password"]  # Don't return the password hash
     
-    return user 
\ No newline at end of file
+    if AUTH_CACHE_ENABLED:
+        principal_cache.set(user["id"], dict(user))
+    
+    return user
+
+
+async def lookup_user(users: UserRepository, user_id: str) -> Optional[dict]:
+    """Get a user by id, sharing the query with identical lookups in flight.
+
+    Returns a copy, so callers may change it. Raises InvalidIdError like
+    ``UserRepository.get``.
+    """
+    user = await _user_lookups.do(user_id, lambda: users.get(user_id))
+    return dict(user) if user is not None else None
+
+
+def auth_cache_stats() -> dict:
+    """Return hit/miss counters for the token and principal caches."""
+    return {
+        "enabled": AUTH_CACHE_ENABLED,
+        "tokens": token_cache.stats(),
+        "principals": principal_cache.stats(),
+    }
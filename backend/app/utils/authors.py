@@ -0,0 +1,77 @@
+from typing import Dict, Iterable
+import os
+from dotenv import load_dotenv
+
+from app.repositories import get_user_repository
+from app.utils.cache import LRUCache
+from app.utils.single_flight import SingleFlight
+
+load_dotenv()
+
+# Author cache configurations
+AUTHOR_CACHE_SIZE = int(os.getenv("AUTHOR_CACHE_SIZE", "10000"))
+AUTHOR_CACHE_TTL = float(os.getenv("AUTHOR_CACHE_TTL", "300"))
+
+UNKNOWN_AUTHOR = "Unknown"
+
+author_cache = LRUCache(maxsize=AUTHOR_CACHE_SIZE, ttl=AUTHOR_CACHE_TTL)
+
+# Identical concurrent batches of cache misses share one lookup
+_author_lookups = SingleFlight("authors")
+
+
+async def resolve_authors(author_ids: Iterable[str]) -> Dict[str, str]:
+    """Map author ids to usernames.
+
+    Cached ids are answered from memory and all the others are fetched with a
+    single repository lookup, so the cost of a page does not grow with
+    the number of distinct authors on it. Concurrent requests missing the
+    same authors share that lookup.
+    """
+    authors = {}
+    missing = []
+
+    for author_id in set(author_ids):
+        username = author_cache.get(author_id)
+        if username is None:
+            missing.append(author_id)
+        else:
+            authors[author_id] = username
+
+    if not missing:
+        return authors
+
+    users = get_user_repository()
+    usernames = await _author_lookups.do(frozenset(missing), lambda: users.get_usernames(missing))
+    for user_id, username in usernames.items():
+        authors[user_id] = username
+        author_cache.set(user_id, username)
+
+    # Remember authors that no longer exist so they are not looked up again
+    for author_id in missing:
+        if author_id not in authors:
+            authors[author_id] = UNKNOWN_AUTHOR
+            author_cache.set(author_id, UNKNOWN_AUTHOR)
+
+    return authors
+
+
+async def resolve_author(author_id: str) -> str:
+    """Return the username for a single author id."""
+    authors = await resolve_authors([author_id])
+    return authors[author_id]
+
+
+def remember_author(author_id: str, username: str) -> None:
+    """Prime the cache with an author we already know about."""
+    author_cache.set(author_id, username)
+
+
+def invalidate_author(author_id: str) -> None:
+    """Drop an author from the cache, e.g. after the user record changes."""
+    author_cache.pop(author_id)
+
+
+def author_cache_stats() -> dict:
+    """Return hit/miss counters for the author cache."""
+    return author_cache.stats()
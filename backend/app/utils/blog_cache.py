@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+import hashlib
+import os
+from dotenv import load_dotenv
+
+from app.utils.cache import LRUCache
+from app.utils.serialization import blog_serializer, html_blog_serializer
+
+load_dotenv()
+
+# Blog cache configurations
+BLOG_CACHE_SIZE = int(os.getenv("BLOG_CACHE_SIZE", "2048"))
+BLOG_CACHE_TTL = float(os.getenv("BLOG_CACHE_TTL", "600"))
+
+
+class CachedBlog(NamedTuple):
+    body: bytes
+    etag: str
+    updated_at: datetime
+    # Content-Encoding -> compressed body, filled the first time each is requested
+    compressed: Dict[str, bytes]
+
+
+blog_cache = LRUCache(maxsize=BLOG_CACHE_SIZE, ttl=BLOG_CACHE_TTL)
+
+# Bumped on every invalidation so reads that raced a write don't re-cache stale data
+_generation = 0
+
+
+def make_etag(blog_id: str, updated_at: datetime) -> str:
+    """Build a strong ETag from the blog id and its last modification time."""
+    digest = hashlib.sha1(f"{blog_id}:{updated_at.isoformat()}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cache_generation() -> int:
+    """Return the current invalidation generation, to pass to cache_blog later."""
+    return _generation
+
+
+def _cache_key(blog_id: str, html: bool):
+    return (blog_id, "html") if html else blog_id
+
+
+def get_cached_blog(blog_id: str, html: bool = False) -> Optional[CachedBlog]:
+    """Return the serialized blog (with ``content_html`` if ``html``) if it is cached."""
+    return blog_cache.get(_cache_key(blog_id, html))
+
+
+def cache_blog(blog: dict, generation: int, html: bool = False) -> CachedBlog:
+    """Serialize a formatted blog response once and cache it.
+
+    The entry is only stored if no invalidation happened since ``generation``
+    was read, so a slow read can't overwrite the result of a later write.
+    The HTML variant is cached separately, with its own ETag.
+    """
+    serializer = html_blog_serializer if html else blog_serializer
+    body = serializer.dump(blog)
+    etag = make_etag(f"{blog['id']}:html" if html else blog["id"], blog["updated_at"])
+    entry = CachedBlog(body, etag, blog["updated_at"], {})
+
+    if generation == _generation:
+        blog_cache.set(_cache_key(blog["id"], html), entry)
+    return entry
+
+
+def invalidate_blog(blog_id: str) -> None:
+    """Drop a blog from the cache after it was updated or deleted."""
+    global _generation
+    _generation += 1
+    blog_cache.pop(blog_id)
+    blog_cache.pop(_cache_key(blog_id, True))
+
+
+def blog_cache_stats() -> dict:
+    """Return hit/miss counters for the blog cache."""
+    return blog_cache.stats()
@@ -0,0 +1,71 @@
+from typing import AsyncIterator, Tuple
+import json
+import os
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from app.models.blog import BlogCreate
+
+load_dotenv()
+
+# Bulk import configurations
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+
+
+class BulkFormatError(ValueError):
+    """Raised when a bulk request body is neither a JSON array nor NDJSON."""
+
+
+async def _iter_lines(stream) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without buffering more than one chunk."""
+    remainder = b""
+    async for chunk in stream:
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield line
+    if remainder:
+        yield remainder
+
+
+async def iter_bulk_items(request) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (index, item) pairs from a JSON array or an NDJSON request body.
+
+    NDJSON is read incrementally and its items are yielded as raw bytes, so
+    parsing and validation happen in one step per line; blank lines are
+    skipped. A JSON array has to be read in full before the first item.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        index = 0
+        async for line in _iter_lines(request.stream()):
+            if line.strip():
+                yield index, line
+                index += 1
+        return
+
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        raise BulkFormatError("Body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise BulkFormatError("Body must be a JSON array or NDJSON")
+    for index, item in enumerate(items):
+        yield index, item
+
+
+def validate_blog_item(item) -> BlogCreate:
+    """Validate one bulk item (raw NDJSON bytes or a decoded object).
+
+    Raises ValidationError, which also covers malformed JSON lines.
+    """
+    if isinstance(item, bytes):
+        return BlogCreate.model_validate_json(item)
+    return BlogCreate.model_validate(item)
+
+
+def describe_error(error: ValidationError) -> list:
+    """Return a validation error in the shape FastAPI uses for 422 details."""
+    return error.errors(include_url=False, include_input=False)
@@ -0,0 +1,152 @@
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+import os
+import time
+import zlib
+from dotenv import load_dotenv
+from fastapi import Response
+
+from app import metrics
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - gzip and deflate only
+    zstandard = None
+
+load_dotenv()
+
+# Response compression configurations; levels favour latency over the last few percent of size
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Server preference when the client accepts several encodings equally
+ENCODINGS: Tuple[str, ...] = (("zstd",) if zstandard else ()) + ("gzip", "deflate")
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the encoding for a response from an Accept-Encoding header, or None.
+
+    Honours q-values (``q=0`` refuses an encoding, ``*`` covers the ones not
+    listed); ties go to the server's order in ENCODINGS. Clients send a
+    handful of distinct headers, so results are memoized.
+    """
+    if not COMPRESSION_ENABLED or not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        name = name.strip()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            weights[name] = quality
+
+    default = weights.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = weights.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    """Return True for JSON and text bodies; images and archives are left alone."""
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _compressor(encoding: str):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+    # wbits: 31 writes a gzip header and trailer, 15 the zlib format HTTP calls "deflate"
+    return zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31 if encoding == "gzip" else 15)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole response body, recording its ratio and CPU time."""
+    started = time.thread_time()
+    compressor = _compressor(encoding)
+    compressed = compressor.compress(body) + compressor.flush()
+    metrics.observe_compression(encoding, len(body), len(compressed), time.thread_time() - started)
+    return compressed
+
+
+class StreamCompressor:
+    """Compress a streamed body chunk by chunk.
+
+    Every chunk is flushed so a client reading NDJSON line by line is not
+    held up by the compressor's buffer. Metrics are recorded when the
+    stream ends.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self._compressor = _compressor(encoding)
+        if encoding == "zstd":
+            self._sync, self._finish = zstandard.COMPRESSOBJ_FLUSH_BLOCK, zstandard.COMPRESSOBJ_FLUSH_FINISH
+        else:
+            self._sync, self._finish = zlib.Z_SYNC_FLUSH, zlib.Z_FINISH
+        self._size_in = self._size_out = 0
+        self._cpu_seconds = 0.0
+
+    def compress(self, chunk: bytes, final: bool = False) -> bytes:
+        started = time.thread_time()
+        compressed = self._compressor.compress(chunk) + self._compressor.flush(self._finish if final else self._sync)
+        self._cpu_seconds += time.thread_time() - started
+        self._size_in += len(chunk)
+        self._size_out += len(compressed)
+        if final:
+            metrics.observe_compression(self.encoding, self._size_in, self._size_out, self._cpu_seconds)
+        return compressed
+
+
+def encode_body(body: bytes, encoding: Optional[str], variants: Optional[Dict[str, bytes]] = None) -> Tuple[bytes, Optional[str]]:
+    """Return the body to send and its Content-Encoding (None when sent as is).
+
+    Small bodies are not worth compressing. With ``variants``, a cached
+    response's dict of compressed forms, each encoding is compressed once
+    and reused for every later request.
+    """
+    if encoding is None or len(body) < COMPRESSION_MIN_SIZE:
+        return body, None
+    if variants is None:
+        return compress(body, encoding), encoding
+
+    compressed = variants.get(encoding)
+    if compressed is None:
+        compressed = variants[encoding] = compress(body, encoding)
+    else:
+        metrics.observe_compression_reuse(encoding)
+    return compressed, encoding
+
+
+def compressed_response(
+    body: bytes,
+    accept_encoding: Optional[str],
+    headers: Dict[str, str],
+    variants: Optional[Dict[str, bytes]] = None,
+    media_type: str = "application/json",
+) -> Response:
+    """Build a response for pre-serialized JSON, compressed if the client accepts it.
+
+    The response carries Content-Encoding, so CompressionMiddleware passes
+    it through untouched.
+    """
+    content, encoding = encode_body(body, negotiate(accept_encoding), variants)
+    headers = {**headers, "Vary": "Accept-Encoding"} if COMPRESSION_ENABLED else headers
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        if headers.get("ETag", "W/").startswith('"'):
+            # Compressed bytes differ from the ones the strong ETag describes
+            headers["ETag"] = f"W/{headers['ETag']}"
+    return Response(content=content, media_type=media_type, headers=headers)
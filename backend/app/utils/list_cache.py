@@ -0,0 +1,112 @@
+from typing import Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+import asyncio
+import hashlib
+import os
+import time
+from dotenv import load_dotenv
+
+from app.log import get_logger
+from app.utils.cache import LRUCache
+from app.utils.single_flight import SingleFlight
+
+load_dotenv()
+logger = get_logger(__name__)
+
+# List cache configurations: entries are fresh for LIST_CACHE_TTL seconds, then served
+# stale for up to LIST_CACHE_STALE more while one background refresh recomputes them
+LIST_CACHE_SIZE = int(os.getenv("LIST_CACHE_SIZE", "256"))
+LIST_CACHE_TTL = float(os.getenv("LIST_CACHE_TTL", "10"))
+LIST_CACHE_STALE = float(os.getenv("LIST_CACHE_STALE", "60"))
+
+# The same policy for CDNs (s-maxage); browsers revalidate every time, so an
+# author sees their own new post right away, usually through a cheap 304
+LIST_CACHE_CONTROL = (
+    f"public, max-age=0, s-maxage={int(LIST_CACHE_TTL)}, stale-while-revalidate={int(LIST_CACHE_STALE)}"
+)
+
+# Loads a page: returns the serialized body and the X-Next-Cursor value, if any
+Loader = Callable[[], Awaitable[Tuple[bytes, Optional[str]]]]
+
+
+class CachedList(NamedTuple):
+    body: bytes
+    etag: str
+    next_cursor: Optional[str]
+    generation: int
+    stored_at: float
+    # Content-Encoding -> compressed body, filled the first time each is requested
+    compressed: Dict[str, bytes]
+
+
+list_cache = LRUCache(maxsize=LIST_CACHE_SIZE)
+
+# Bumped by every blog write; entries from an older generation are outdated
+_generation = 0
+# One load per page at a time, shared by every request that needs it
+_loads = SingleFlight("lists")
+_stats = {"stale_served": 0}
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+async def _load(key: Hashable, load: Loader) -> CachedList:
+    # The generation is read before loading, so a write racing the load leaves the entry outdated
+    generation = _generation
+    body, next_cursor = await load()
+    entry = CachedList(body, _etag(body), next_cursor, generation, time.monotonic(), {})
+    list_cache.set(key, entry)
+    return entry
+
+
+async def _refresh(key: Hashable, load: Loader) -> CachedList:
+    try:
+        return await _load(key, load)
+    except Exception:
+        # Nobody may be waiting for a background refresh, so it logs its own failures
+        logger.exception("List cache refresh failed")
+        raise
+
+
+def _start_load(key: Hashable, load: Loader, background: bool = False) -> asyncio.Task:
+    # Keyed by generation too: a load that started before the last write may miss it
+    return _loads.start((key, _generation), lambda: (_refresh if background else _load)(key, load))
+
+
+async def get_list(key: Hashable, load: Loader) -> CachedList:
+    """Return the cached page for ``key``, loading it with ``load`` when needed.
+
+    A fresh entry is returned as is. Once its TTL has passed it is still
+    returned for LIST_CACHE_STALE seconds while one background task
+    reloads it. Entries outdated by a write made through this process, too
+    old, or missing are loaded before returning, by a single load shared
+    by all concurrent requests for the key; its errors propagate to them.
+    """
+    entry = list_cache.get(key)
+    if entry is not None and entry.generation == _generation:
+        age = time.monotonic() - entry.stored_at
+        if age < LIST_CACHE_TTL:
+            return entry
+        if age < LIST_CACHE_TTL + LIST_CACHE_STALE:
+            _stats["stale_served"] += 1
+            _start_load(key, load, background=True)
+            return entry
+    # Shielded: one client going away must not cancel the load others are waiting for
+    return await asyncio.shield(_start_load(key, load))
+
+
+def invalidate_lists() -> None:
+    """Mark every cached page stale after a blog was created, updated or deleted."""
+    global _generation
+    _generation += 1
+
+
+async def cancel_list_refreshes() -> None:
+    """Cancel loads still running on shutdown, before storage closes."""
+    await _loads.cancel()
+
+
+def list_cache_stats() -> dict:
+    """Return hit/miss counters plus stale serves (page loads are under single_flight)."""
+    return {**list_cache.stats(), **_stats}
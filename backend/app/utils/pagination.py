@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Tuple
+import base64
+from bson import ObjectId
+
+
+def encode_cursor(created_at: datetime, blog_id) -> str:
+    """Build an opaque keyset cursor from the sort key of the last item on a page."""
+    raw = f"{created_at.isoformat()}|{blog_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Parse a cursor produced by encode_cursor into (created_at, blog_id).
+
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, blog_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        if not ObjectId.is_valid(blog_id):
+            raise ValueError(blog_id)
+        return datetime.fromisoformat(created_at), blog_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
@@ -0,0 +1,197 @@
+from typing import Dict, List, NamedTuple, Optional
+import hashlib
+import math
+import os
+import struct
+import time
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request, status
+
+from app.log import get_logger
+
+load_dotenv()
+logger = get_logger(__name__)
+
+# Rate limit configurations: "<requests>/<seconds>" per client IP and per account, "off" to disable
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "local").lower()
+RATE_LIMIT_FILE = os.getenv("RATE_LIMIT_FILE", "/tmp/qblog-rate-limits")
+RATE_LIMIT_SLOTS = int(os.getenv("RATE_LIMIT_SLOTS", "65536"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+
+class RateLimit(NamedTuple):
+    rate: float   # tokens added per second
+    burst: float  # bucket size
+
+
+def parse_rate_limit(value: str) -> Optional[RateLimit]:
+    """Parse "<requests>/<seconds>" (e.g. "10/60"); "off" or "0" disables the limit."""
+    value = value.strip().lower()
+    if value in ("", "0", "off", "none"):
+        return None
+    requests, _, seconds = value.partition("/")
+    requests, seconds = float(requests), float(seconds or 1)
+    return RateLimit(rate=requests / seconds, burst=requests)
+
+
+RATE_LIMITS: Dict[str, Optional[RateLimit]] = {
+    "login": parse_rate_limit(os.getenv("RATE_LIMIT_LOGIN", "10/60")),
+    "register": parse_rate_limit(os.getenv("RATE_LIMIT_REGISTER", "5/600")),
+    "fallback": parse_rate_limit(os.getenv("RATE_LIMIT_FALLBACK", "10/60")),
+}
+
+
+def _take(tokens: float, updated_at: float, limit: RateLimit, now: float):
+    """Refill a bucket and try to take one token; return (tokens, seconds to wait)."""
+    tokens = min(limit.burst, tokens + max(0.0, now - updated_at) * limit.rate)
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+    return tokens, (1.0 - tokens) / limit.rate
+
+
+class LocalBucketStore:
+    """Token buckets in a dict, for a single worker process.
+
+    Each bucket is a two-item list updated in place, so a check on a known
+    key is one dict lookup and no new objects. When the dict reaches
+    ``max_keys``, buckets idle for an hour are dropped first, then the oldest.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, List[float]] = {}
+
+    def take(self, key: str, limit: RateLimit, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = [limit.burst, now]
+        bucket[0], wait = _take(bucket[0], bucket[1], limit, now)
+        bucket[1] = now
+        return wait
+
+    def _prune(self, now: float) -> None:
+        # Amortized: runs once per max_keys new keys at most
+        for key in [k for k, (tokens, updated_at) in self._buckets.items() if updated_at < now - 3600]:
+            del self._buckets[key]
+        while len(self._buckets) >= self.max_keys:
+            del self._buckets[next(iter(self._buckets))]
+
+    def stats(self) -> dict:
+        return {"store": "local", "keys": len(self._buckets)}
+
+
+# Shared slot layout: key hash, tokens, last update (wall clock, comparable across processes)
+_SLOT = struct.Struct("<Qdd")
+
+
+class SharedBucketStore:
+    """Token buckets in a memory-mapped file shared by every worker on a host.
+
+    Keys hash to a fixed slot, which is locked with a byte-range lock for
+    the read-modify-write, so a check is O(1) whatever the number of
+    clients. A key landing on a slot used by another key starts with a
+    full bucket (it is an approximate limiter, not an exact one).
+    """
+
+    def __init__(self, path: str = RATE_LIMIT_FILE, slots: int = RATE_LIMIT_SLOTS):
+        import fcntl
+        import mmap
+
+        self._fcntl = fcntl
+        self.path = path
+        self.slots = slots
+        size = slots * _SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def take(self, key: str, limit: RateLimit, now: float) -> float:
+        digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        offset = (digest % self.slots) * _SLOT.size
+
+        self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX, _SLOT.size, offset)
+        try:
+            stored, tokens, updated_at = _SLOT.unpack_from(self._map, offset)
+            if stored != digest:
+                tokens, updated_at = limit.burst, now
+            tokens, wait = _take(tokens, updated_at, limit, now)
+            _SLOT.pack_into(self._map, offset, digest, tokens, now)
+        finally:
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, _SLOT.size, offset)
+        return wait
+
+    def stats(self) -> dict:
+        return {"store": "shared", "path": self.path, "slots": self.slots}
+
+
+_store = None
+_rejected: Dict[str, int] = {}
+
+
+def get_store():
+    """Return the configured bucket store, created on first use."""
+    global _store
+    if _store is None:
+        if RATE_LIMIT_STORE == "shared":
+            _store = SharedBucketStore()
+        elif RATE_LIMIT_STORE == "local":
+            _store = LocalBucketStore()
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_STORE: {RATE_LIMIT_STORE}")
+    return _store
+
+
+def set_store(store) -> None:
+    """Install a specific bucket store, e.g. a shared one in tests or benchmarks."""
+    global _store
+    _store = store
+
+
+def client_ip(request: Request) -> str:
+    """Return the client address, from X-Forwarded-For when the proxy is trusted."""
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def enforce_rate_limit(name: str, request: Request, account: Optional[str] = None) -> None:
+    """Take a token from the client IP's and the account's bucket for this route.
+
+    Raises a 429 HTTPException with Retry-After when either is empty. The
+    account is only charged once the IP is within its limit, so a client
+    flooding logins for someone else's email can't lock them out. Call it
+    before any expensive work (password hashing) so floods stay cheap.
+    """
+    limit = RATE_LIMITS.get(name)
+    if limit is None or not RATE_LIMIT_ENABLED:
+        return
+
+    store = get_store()
+    now = time.time()
+    wait = store.take(f"{name}:ip:{client_ip(request)}", limit, now)
+    if account and not wait:
+        wait = store.take(f"{name}:account:{account.lower()}", limit, now)
+    if not wait:
+        return
+
+    _rejected[name] = _rejected.get(name, 0) + 1
+    logger.info("Rate limited", extra={"fields": {"route": name, "retry_after": round(wait, 1)}})
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, please try again later",
+        headers={"Retry-After": str(math.ceil(wait))},
+    )
+
+
+def rate_limit_stats() -> dict:
+    """Return the store in use and rejected requests per route."""
+    stats = get_store().stats() if RATE_LIMIT_ENABLED else {"store": "disabled"}
+    stats["rejected"] = dict(_rejected)
+    return stats
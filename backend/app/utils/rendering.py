@@ -0,0 +1,102 @@
+from typing import Optional
+import hashlib
+import html
+import os
+import time
+from dotenv import load_dotenv
+
+from app import metrics
+from app.jobs import job
+from app.repositories import get_blog_repository
+from app.utils.cache import LRUCache
+
+try:
+    from markdown_it import MarkdownIt
+except ImportError:  # pragma: no cover - falls back to escaped plain paragraphs
+    MarkdownIt = None
+
+load_dotenv()
+
+# Markdown rendering configurations
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "1024"))
+
+# Part of every content hash: bump it when rendering changes so stored HTML is redone
+RENDERER_VERSION = f"1-{'commonmark' if MarkdownIt else 'plain'}"
+
+html_cache = LRUCache(maxsize=RENDER_CACHE_SIZE)
+
+
+def _link_open(self, tokens, idx, options, env):
+    # Links in posts are user content
+    tokens[idx].attrSet("rel", "nofollow ugc noopener")
+    return self.renderToken(tokens, idx, options, env)
+
+
+if MarkdownIt is not None:
+    # CommonMark like the frontend's react-markdown. Raw HTML is escaped rather than passed
+    # through, and markdown-it refuses javascript:, vbscript:, file: and non-image data: URLs.
+    _markdown = MarkdownIt("commonmark", {"html": False})
+    _markdown.add_render_rule("link_open", _link_open)
+else:
+    _markdown = None
+
+
+def _render(content: str) -> str:
+    if _markdown is not None:
+        return _markdown.render(content)
+    paragraphs = (part.strip() for part in content.split("\n\n"))
+    return "".join(f"<p>{html.escape(part)}</p>\n" for part in paragraphs if part)
+
+
+def content_hash(content: str) -> str:
+    """Key rendered HTML by the content and the renderer that produced it."""
+    digest = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+    return f"{RENDERER_VERSION}:{digest}"
+
+
+def render_markdown(content: str, key: Optional[str] = None) -> str:
+    """Return sanitized HTML for Markdown, rendering each distinct content once per process."""
+    key = key or content_hash(content)
+    rendered = html_cache.get(key)
+    if rendered is None:
+        started = time.perf_counter()
+        rendered = _render(content)
+        metrics.observe_markdown_render(time.perf_counter() - started)
+        html_cache.set(key, rendered)
+    return rendered
+
+
+def rendered_fields(content: str) -> dict:
+    """Compute the ``content_html`` and ``content_hash`` fields stored with a post."""
+    key = content_hash(content)
+    return {"content_html": render_markdown(content, key), "content_hash": key}
+
+
+def attach_html(blog: dict) -> bool:
+    """Set ``content_html`` and ``content_hash`` on a stored blog for an HTML response.
+
+    The persisted copy is used while its hash still matches the content and
+    renderer; otherwise (posts written before rendering existed, or before
+    a renderer change) the HTML comes from the cache or a fresh render, and
+    True is returned so the caller can persist it.
+    """
+    content = blog.get("content") or ""
+    key = content_hash(content)
+    if blog.get("content_hash") == key and blog.get("content_html") is not None:
+        return False
+    blog["content_html"] = render_markdown(content, key)
+    blog["content_hash"] = key
+    return True
+
+
+@job("store_rendered_html")
+async def store_rendered_html(blog_id: str, content_html: str, content_hash: str) -> None:
+    """Persist HTML rendered on read, so no other instance has to render it again."""
+    # updated_at is left alone: the post itself didn't change. If the content changed
+    # meanwhile, the hash no longer matches it and the HTML is simply ignored.
+    await get_blog_repository().update(blog_id, {"content_html": content_html, "content_hash": content_hash})
+
+
+def render_cache_stats() -> dict:
+    """Return hit/miss counters for the rendered HTML cache."""
+    return html_cache.stats()
@@ -0,0 +1,600 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
+from heapq import nlargest
+from operator import itemgetter
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import asyncio
+import io
+import math
+import os
+import pickle
+import re
+import time
+from dotenv import load_dotenv
+
+from app.log import get_logger
+from app.repositories import BlogRepository
+
+load_dotenv()
+logger = get_logger(__name__)
+
+# Search configurations
+SEARCH_ENABLED = os.getenv("SEARCH_ENABLED", "true").lower() == "true"
+# Snapshot file loaded at startup so only posts changed since are re-tokenized ("" disables it)
+SEARCH_SNAPSHOT_PATH = os.getenv("SEARCH_SNAPSHOT_PATH", "search_index.pickle")
+SEARCH_SNAPSHOT_INTERVAL = float(os.getenv("SEARCH_SNAPSHOT_INTERVAL", "600"))
+# A title word counts as this many body words
+SEARCH_TITLE_BOOST = float(os.getenv("SEARCH_TITLE_BOOST", "3"))
+# BM25 term frequency saturation and length normalization
+SEARCH_BM25_K1 = float(os.getenv("SEARCH_BM25_K1", "1.2"))
+SEARCH_BM25_B = float(os.getenv("SEARCH_BM25_B", "0.75"))
+# Words in more than this share of posts only rank posts that rarer query words matched
+SEARCH_COMMON_TERM_RATIO = float(os.getenv("SEARCH_COMMON_TERM_RATIO", "0.1"))
+
+_TOKEN = re.compile(r"[^\W_]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he i in is it its of on or she"
+    " that the their they this to was we were will with you".split()
+)
+_MAX_TOKEN_LENGTH = 40
+_SNAPSHOT_VERSION = 2
+# Postings per pickle in a snapshot: small pickles let a snapshot thread give the GIL back often
+_SNAPSHOT_CHUNK = 50000
+
+
+def term_counts(text: str) -> Counter:
+    """Count the lowercase words in text, without stopwords or very long tokens."""
+    # Counting first and filtering the distinct words is much cheaper than filtering every token
+    counts = Counter(_TOKEN.findall(text.casefold()))
+    for term in _STOPWORDS.intersection(counts):
+        del counts[term]
+    for term in [term for term in counts if len(term) > _MAX_TOKEN_LENGTH]:
+        del counts[term]
+    return counts
+
+
+def _timestamp(value: datetime) -> float:
+    # Stored datetimes are naive UTC
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class SearchIndex:
+    """Inverted index over blog titles and content, ranked with BM25.
+
+    Each post gets a document number, and a term's postings are two
+    parallel arrays: ascending document numbers and the BM25 term
+    frequency part of the score ("impact"), computed when the post is
+    indexed with the average post length at that time. A title occurrence
+    counts as SEARCH_TITLE_BOOST body occurrences. Queries then only
+    multiply impacts by the term's idf, and a posting costs 8 bytes.
+
+    Removing or re-indexing a post blanks its number. A postings list
+    drops blanked numbers the next time it is queried after a removal,
+    which also keeps document frequencies exact; ``compact`` renumbers
+    everything before a snapshot once many numbers are blank.
+
+    Postings arrays are only ever appended to or replaced, never changed
+    in place, which is what lets ``freeze`` share them with a snapshot
+    being written in another thread.
+    """
+
+    def __init__(
+        self,
+        title_boost: float = SEARCH_TITLE_BOOST,
+        k1: float = SEARCH_BM25_K1,
+        b: float = SEARCH_BM25_B,
+        common_term_ratio: float = SEARCH_COMMON_TERM_RATIO,
+    ):
+        self.title_boost, self.k1, self.b = title_boost, k1, b
+        self.common_term_ratio = common_term_ratio
+        self._clear()
+
+    def _clear(self) -> None:
+        self._ids: List[Optional[str]] = []  # document number -> blog id, None once removed
+        self._lengths = array("f")           # document number -> weighted token count
+        self._updated = array("d")           # document number -> updated_at timestamp
+        self._numbers: Dict[str, int] = {}   # blog id -> current document number
+        # term -> [document numbers, impacts, removal count when last cleaned]
+        self._postings: Dict[str, list] = {}
+        self._total_length = 0.0
+        self._removals = 0
+        # Ids removed while a build is scanning storage, so its older copies are not re-added
+        self._removed_while_building: Optional[Set[str]] = None
+        self.watermark: Optional[datetime] = None
+        self.dirty = False
+        # Bumped by every change, so a compacted copy is only swapped in if nothing changed since
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def add(self, blog: dict) -> bool:
+        """Index a blog, replacing an older version; return False if that version is already indexed."""
+        blog_id = blog["id"]
+        updated = _timestamp(blog["updated_at"])
+        if self._removed_while_building is not None and blog_id in self._removed_while_building:
+            return False
+        number = self._numbers.get(blog_id)
+        if number is not None:
+            if self._updated[number] >= updated:
+                return False
+            self._remove_number(number)
+
+        weights = term_counts(blog.get("content") or "")
+        for term, count in term_counts(blog.get("title") or "").items():
+            weights[term] += count * self.title_boost
+
+        number = len(self._ids)
+        length = sum(weights.values())
+        self._ids.append(blog_id)
+        self._lengths.append(length)
+        self._updated.append(updated)
+        self._numbers[blog_id] = number
+        self._total_length += length
+
+        # BM25: w * (k1 + 1) / (w + k1 * (1 - b + b * length / average length))
+        k1 = self.k1
+        average = self._total_length / len(self._numbers)
+        norm = k1 * (1 - self.b + self.b * length / average) if average else k1
+        postings = self._postings
+        saturation = k1 + 1
+        for term, weight in weights.items():
+            entry = postings.get(term)
+            if entry is None:
+                entry = postings[term] = [array("I"), array("f"), self._removals]
+            entry[0].append(number)
+            entry[1].append(weight * saturation / (weight + norm))
+
+        if self.watermark is None or blog["updated_at"] > self.watermark:
+            self.watermark = blog["updated_at"]
+        self.dirty = True
+        self.version += 1
+        return True
+
+    def remove(self, blog_id: str) -> bool:
+        """Drop a blog from the index; return whether it was there."""
+        if self._removed_while_building is not None:
+            self._removed_while_building.add(blog_id)
+        number = self._numbers.pop(blog_id, None)
+        if number is None:
+            return False
+        self._remove_number(number)
+        return True
+
+    def _remove_number(self, number: int) -> None:
+        self._ids[number] = None
+        self._total_length -= self._lengths[number]
+        self._removals += 1
+        self.dirty = True
+        self.version += 1
+
+    def _live_postings(self, term: str) -> Tuple[array, array]:
+        entry = self._postings.get(term)
+        if entry is None:
+            return array("I"), array("f")
+        numbers, impacts, cleaned_at = entry
+        if cleaned_at != self._removals:
+            ids = self._ids
+            keep = [i for i, number in enumerate(numbers) if ids[number] is not None]
+            if len(keep) < len(numbers):
+                # A new entry rather than new arrays in this one: a frozen copy may share it
+                numbers = array("I", [numbers[i] for i in keep])
+                impacts = array("f", [impacts[i] for i in keep])
+                entry = self._postings[term] = [numbers, impacts, self._removals]
+            entry[2] = self._removals
+            if not numbers:
+                del self._postings[term]
+        return numbers, impacts
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` (blog id, score) pairs, best match first.
+
+        Any query word may match, and posts matching more and rarer words
+        rank higher. Words found in more than ``common_term_ratio`` of the
+        posts only add to the score of posts matched by the rarer words
+        (as in Lucene's common terms query), unless the query has nothing
+        rarer; that keeps queries with a very common word from scoring
+        nearly every post.
+        """
+        live = len(self._numbers)
+        terms = term_counts(query)
+        if not terms or not live:
+            return []
+
+        matches = []
+        for term in terms:
+            numbers, impacts = self._live_postings(term)
+            if numbers:
+                idf = math.log(1 + (live - len(numbers) + 0.5) / (len(numbers) + 0.5))
+                matches.append((numbers, impacts, idf))
+        if not matches:
+            return []
+        ids = self._ids
+
+        if len(matches) == 1:
+            # Ranking by impact alone; nlargest with a C-level key avoids a Python loop per posting
+            numbers, impacts, idf = matches[0]
+            top = nlargest(limit, range(len(numbers)), key=impacts.__getitem__)
+            return [(ids[numbers[i]], idf * impacts[i]) for i in top]
+
+        cutoff = live * self.common_term_ratio
+        selective = [match for match in matches if len(match[0]) <= cutoff]
+        common = [match for match in matches if len(match[0]) > cutoff] if selective else []
+
+        scores: Dict[int, float] = {}
+        get = scores.get
+        for numbers, impacts, idf in selective or matches:
+            for number, impact in zip(numbers, impacts):
+                scores[number] = get(number, 0.0) + idf * impact
+        for numbers, impacts, idf in common:
+            # Postings are sorted by document number, so each candidate is a binary search
+            size = len(numbers)
+            for number in scores:
+                i = bisect_left(numbers, number)
+                if i < size and numbers[i] == number:
+                    scores[number] += idf * impacts[i]
+
+        return [(ids[number], score) for number, score in nlargest(limit, scores.items(), key=itemgetter(1))]
+
+    def begin_build(self, removed: Iterable[str] = ()) -> None:
+        """Track removals until ``end_build``, dropping ``removed`` (ones seen by a previous index) first."""
+        self._removed_while_building = set()
+        for blog_id in removed:
+            self.remove(blog_id)
+
+    def end_build(self) -> Set[str]:
+        removed, self._removed_while_building = self._removed_while_building, None
+        return removed or set()
+
+    @property
+    def building(self) -> bool:
+        return self._removed_while_building is not None
+
+    def compact(self) -> None:
+        """Renumber live posts densely and drop removed ones from every postings list."""
+        header, postings = _snapshot_state(self.freeze(), compact=True)
+        _, self._ids, self._lengths, self._updated, _ = header
+        self._postings = {term: [numbers, impacts, 0] for term, numbers, impacts in postings}
+        self._numbers = {blog_id: number for number, blog_id in enumerate(self._ids)}
+        self._removals = 0
+
+    def removed_fraction(self) -> float:
+        return 1 - len(self._numbers) / len(self._ids) if self._ids else 0.0
+
+    def _settings(self) -> tuple:
+        # Impacts depend on these, so a snapshot taken with other values is rebuilt instead
+        return (_SNAPSHOT_VERSION, self.title_boost, self.k1, self.b)
+
+    def freeze(self) -> tuple:
+        """Capture the contents for ``write_snapshot``, which may run in another thread.
+
+        Cheap enough for the event loop: only the id list (changed in place
+        by removals) and the postings dict are copied. Arrays are shared;
+        entries appended to them later have document numbers past the
+        copied ids, and the writer cuts them off.
+        """
+        return (self._settings(), list(self._ids), self._lengths, self._updated, dict(self._postings), self.watermark)
+
+    def dump(self) -> bytes:
+        """Serialize the index for a snapshot."""
+        buffer = io.BytesIO()
+        write_snapshot(buffer, self.freeze())
+        return buffer.getvalue()
+
+    def load(self, data: bytes) -> bool:
+        """Replace the contents with a snapshot; return False if it was taken with other settings."""
+        return self.read(io.BytesIO(data))
+
+    def read(self, file: BinaryIO) -> bool:
+        """Replace the contents with a snapshot read from ``file``; False if it was taken with other settings."""
+        header = pickle.load(file)
+        if header[0] != self._settings():
+            return False
+        _, ids, lengths, updated, watermark = header
+        self._clear()
+        self._ids, self._lengths, self._updated, self.watermark = ids, lengths, updated, watermark
+        self._numbers = {blog_id: number for number, blog_id in enumerate(ids) if blog_id is not None}
+        self._total_length = sum(lengths[number] for number in self._numbers.values())
+        # Snapshots taken before compaction have blank numbers for the first queries to clean up
+        self._removals = len(ids) - len(self._numbers)
+        while True:
+            chunk = pickle.load(file)
+            if chunk is None:
+                break
+            for term, numbers, impacts in chunk:
+                self._postings[term] = [numbers, impacts, 0]
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "posts": len(self._numbers),
+            "terms": len(self._postings),
+            "removed": len(self._ids) - len(self._numbers),
+        }
+
+
+def _snapshot_state(frozen: tuple, compact: bool = False) -> Tuple[tuple, Iterator[Tuple[str, array, array]]]:
+    """Split ``SearchIndex.freeze()`` output into a snapshot header and its postings.
+
+    Postings are generated lazily and cut off at the frozen document
+    count; with ``compact`` removed posts are dropped and the rest renumbered.
+    """
+    settings, ids, lengths, updated, entries, watermark = frozen
+    size = len(ids)
+    lengths, updated = lengths[:size], updated[:size]
+    remap = None
+    if compact:
+        remap = array("i", [-1]) * size
+        kept_ids, kept_lengths, kept_updated = [], array("f"), array("d")
+        for number, blog_id in enumerate(ids):
+            if blog_id is not None:
+                remap[number] = len(kept_ids)
+                kept_ids.append(blog_id)
+                kept_lengths.append(lengths[number])
+                kept_updated.append(updated[number])
+        ids, lengths, updated = kept_ids, kept_lengths, kept_updated
+
+    def postings() -> Iterator[Tuple[str, array, array]]:
+        for term, entry in entries.items():
+            numbers, impacts = entry[0], entry[1]
+            # Postings are sorted, so numbers added after freezing are a suffix
+            end = bisect_left(numbers, size)
+            if remap is None:
+                if end:
+                    yield term, numbers[:end], impacts[:end]
+                continue
+            kept_numbers, kept_impacts = array("I"), array("f")
+            for i in range(end):
+                new_number = remap[numbers[i]]
+                if new_number >= 0:
+                    kept_numbers.append(new_number)
+                    kept_impacts.append(impacts[i])
+            if kept_numbers:
+                yield term, kept_numbers, kept_impacts
+
+    return (settings, ids, lengths, updated, watermark), postings()
+
+
+def write_snapshot(file: BinaryIO, frozen: tuple, compact: bool = False) -> None:
+    """Write ``SearchIndex.freeze()`` output to ``file`` as a header and postings in small pickles.
+
+    Safe to run in a thread while the frozen index keeps changing.
+    """
+    header, postings = _snapshot_state(frozen, compact)
+    pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+    chunk, size = [], 0
+    for term, numbers, impacts in postings:
+        chunk.append((term, numbers, impacts))
+        size += len(numbers)
+        if size >= _SNAPSHOT_CHUNK:
+            pickle.dump(chunk, file, protocol=pickle.HIGHEST_PROTOCOL)
+            chunk, size = [], 0
+    if chunk:
+        pickle.dump(chunk, file, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.dump(None, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+search_index = SearchIndex()
+_build_task: Optional[asyncio.Task] = None
+_snapshot_task: Optional[asyncio.Task] = None
+_snapshot_write: Optional[asyncio.Future] = None
+# Set by start_search_indexing; without it (serverless mode) searches never build the index from scratch
+_indexing_started = False
+_stats = {"queries": 0, "build_seconds": None, "from_snapshot": False, "snapshots": 0}
+
+
+class SearchIndexUnavailable(RuntimeError):
+    """Raised by searches in serverless mode while there is no snapshot to load."""
+
+
+def _write_file(path: str, data: bytes) -> None:
+    # Written next to the target and renamed, so a crash never leaves half a snapshot
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def _save_snapshot(path: str, frozen: tuple, compact: bool) -> Optional[SearchIndex]:
+    buffer = io.BytesIO()
+    write_snapshot(buffer, frozen, compact)
+    _write_file(path, buffer.getbuffer())
+    if not compact:
+        return None
+    # The compacted index, for the event loop to swap in
+    buffer.seek(0)
+    index = SearchIndex()
+    index.read(buffer)
+    return index
+
+
+def _read_snapshot(path: str) -> Optional[SearchIndex]:
+    try:
+        with open(path, "rb") as file:
+            index = SearchIndex()
+            return index if index.read(file) else None
+    except FileNotFoundError:
+        return None
+
+
+async def save_search_snapshot(path: str = SEARCH_SNAPSHOT_PATH) -> None:
+    """Write the index to ``path`` if it changed since the last snapshot.
+
+    Only ``freeze`` runs on the event loop; compaction, pickling and the
+    write go to a thread. A compacted copy replaces the index if nothing
+    changed it in the meantime.
+    """
+    global _snapshot_write, search_index
+    if not path or not search_index.dirty:
+        return
+    if _snapshot_write is not None and not _snapshot_write.done():
+        # One write at a time, even when the periodic task was cancelled mid-write
+        await asyncio.gather(_snapshot_write, return_exceptions=True)
+    index = search_index
+    version = index.version
+    compact = index.removed_fraction() > 0.25 and not index.building
+    frozen = index.freeze()
+    index.dirty = False
+    _snapshot_write = asyncio.get_running_loop().run_in_executor(None, _save_snapshot, path, frozen, compact)
+    try:
+        compacted = await asyncio.shield(_snapshot_write)
+    except OSError as e:
+        index.dirty = True
+        logger.warning(f"Could not write search snapshot: {e}")
+        return
+    _stats["snapshots"] += 1
+    if compacted is not None and search_index is index and index.version == version and not index.building:
+        search_index = compacted
+
+
+async def _load_search_snapshot(path: str) -> Optional[SearchIndex]:
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, _read_snapshot, path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable search snapshot: {e}")
+        return None
+
+
+async def build_search_index(blogs: BlogRepository, require_snapshot: bool = False) -> None:
+    """Load the snapshot, then index every post created or updated since it was taken.
+
+    Without a snapshot that is every post, unless ``require_snapshot`` is
+    set: then SearchIndexUnavailable is raised instead, and the snapshot is
+    only read, never written. Posts deleted while no process was watching
+    stay in the index until a search runs into them.
+    """
+    global search_index
+    started = time.perf_counter()
+    search_index.begin_build()
+    try:
+        snapshot = await _load_search_snapshot(SEARCH_SNAPSHOT_PATH) if SEARCH_SNAPSHOT_PATH else None
+    except asyncio.CancelledError:
+        search_index.end_build()
+        raise
+    if snapshot is not None:
+        # Deletions made while it loaded are replayed; other writes are newer than it, so the export has them
+        snapshot.begin_build(search_index.end_build())
+        search_index = snapshot
+    elif require_snapshot:
+        search_index.end_build()
+        raise SearchIndexUnavailable(f"No search snapshot at {SEARCH_SNAPSHOT_PATH or '(SEARCH_SNAPSHOT_PATH unset)'}")
+    from_snapshot = snapshot is not None
+
+    index = search_index
+    indexed = 0
+    try:
+        async for batch in blogs.export(since=index.watermark):
+            for blog in batch:
+                indexed += index.add(blog)
+    except Exception:
+        logger.exception("Search index build failed")
+        raise
+    finally:
+        index.end_build()
+
+    _stats["build_seconds"] = round(time.perf_counter() - started, 3)
+    _stats["from_snapshot"] = from_snapshot
+    logger.info("Search index built", extra={"fields": {
+        "from_snapshot": from_snapshot,
+        "indexed": indexed,
+        "seconds": _stats["build_seconds"],
+        **index.stats(),
+    }})
+    if not require_snapshot:
+        # Even an empty index is saved after a full build, so serverless instances have a snapshot
+        index.dirty = index.dirty or not from_snapshot
+        await save_search_snapshot()
+
+
+async def _snapshot_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await save_search_snapshot()
+
+
+async def ensure_search_index(blogs: BlogRepository) -> None:
+    """Build the index on first use, or wait for the build already running.
+
+    Without start_search_indexing (serverless mode) the index is only
+    loaded from the snapshot and caught up; building every post inside a
+    request would take far too long, so SearchIndexUnavailable is raised
+    until a snapshot exists.
+    """
+    global _build_task
+    if _build_task is None or _build_task.cancelled() or (_build_task.done() and _build_task.exception()):
+        _build_task = asyncio.get_running_loop().create_task(
+            build_search_index(blogs, require_snapshot=not _indexing_started)
+        )
+    await asyncio.shield(_build_task)
+
+
+def start_search_indexing(blogs: BlogRepository) -> None:
+    """Start building the index in the background and snapshotting it periodically."""
+    global _build_task, _snapshot_task, _indexing_started
+    if not SEARCH_ENABLED:
+        return
+    _indexing_started = True
+    loop = asyncio.get_running_loop()
+    if _build_task is None:
+        _build_task = loop.create_task(build_search_index(blogs))
+        # Failures are logged by the build and retried by the next search
+        _build_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    if SEARCH_SNAPSHOT_PATH and SEARCH_SNAPSHOT_INTERVAL > 0 and _snapshot_task is None:
+        _snapshot_task = loop.create_task(_snapshot_periodically(SEARCH_SNAPSHOT_INTERVAL))
+
+
+async def stop_search_indexing() -> None:
+    """Stop the background tasks and write a final snapshot."""
+    global _build_task, _snapshot_task, _indexing_started
+    _indexing_started = False
+    for task in (_build_task, _snapshot_task):
+        if task is not None and not task.done():
+            task.cancel()
+    build_finished = _build_task is not None and _build_task.done() and not _build_task.cancelled()
+    _build_task = _snapshot_task = None
+    # A half-built index would make the next start skip what it never reached
+    if build_finished:
+        await save_search_snapshot()
+
+
+async def search(blogs: BlogRepository, query: str, skip: int = 0, limit: int = 10) -> List[dict]:
+    """Return summary documents with a ``score`` for the best matches of ``query``."""
+    await ensure_search_index(blogs)
+    _stats["queries"] += 1
+    hits = search_index.search(query, skip + limit)[skip:]
+    if not hits:
+        return []
+
+    found = {blog["id"]: blog for blog in await blogs.get_many((blog_id for blog_id, _ in hits), summary=True)}
+    results = []
+    for blog_id, score in hits:
+        blog = found.get(blog_id)
+        if blog is None:
+            # Deleted by another instance or while this one was down
+            search_index.remove(blog_id)
+            continue
+        blog["score"] = round(score, 4)
+        results.append(blog)
+    return results
+
+
+def index_blog(blog: dict) -> None:
+    """Add or refresh a post after a write made through this process."""
+    if SEARCH_ENABLED:
+        search_index.add(blog)
+
+
+def unindex_blog(blog_id: str) -> None:
+    """Drop a deleted post from the index."""
+    if SEARCH_ENABLED:
+        search_index.remove(blog_id)
+
+
+def search_stats() -> dict:
+    """Return index size, build time and query counters."""
+    if not SEARCH_ENABLED:
+        return {"enabled": False}
+    ready = _build_task is not None and _build_task.done() and not _build_task.cancelled()
+    return {"enabled": True, "ready": ready, **search_index.stats(), **_stats}
@@ -0,0 +1,85 @@
+from typing import Iterable, List, Type
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+from app.models.blog import BlogHTMLResponse, BlogResponse, BlogSearchResult, BlogSummary
+from app.models.user import UserResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to pydantic's encoder
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; pre-serialized bytes are sent as is."""
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, default=_default)
+
+
+class ModelSerializer:
+    """Serialize trusted storage documents in the shape of a response model.
+
+    Repository documents already have the declared types, so validating them
+    again through ``response_model`` only costs time. Documents are projected
+    onto the model's fields in declaration order (which also drops internal
+    keys such as ``hashed_password``), missing optional fields get the model
+    default, and the result is dumped by orjson or, without it, by a
+    precompiled TypeAdapter. Either way the bytes match what FastAPI would
+    send for the same response_model.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self._fields = tuple(model.model_fields.items())
+        self._adapter = self._list_adapter = None
+        if orjson is None:
+            document = TypedDict(f"{model.__name__}Document", {name: field.annotation for name, field in self._fields})
+            self._adapter, self._list_adapter = TypeAdapter(document), TypeAdapter(List[document])
+
+    def project(self, document: dict) -> dict:
+        """Return a plain dict with exactly the model's fields."""
+        projected = {}
+        for name, field in self._fields:
+            if name in document:
+                value = document[name]
+                projected[name] = str(value) if isinstance(value, ObjectId) else value
+            elif field.is_required():
+                raise KeyError(f"{self.model.__name__} document has no {name!r}")
+            else:
+                projected[name] = field.get_default(call_default_factory=True)
+        return projected
+
+    def dump(self, document: dict) -> bytes:
+        """Serialize one document to JSON bytes."""
+        projected = self.project(document)
+        if self._adapter is None:
+            return orjson.dumps(projected)
+        return self._adapter.dump_json(projected)
+
+    def dump_many(self, documents: Iterable[dict]) -> bytes:
+        """Serialize documents to a JSON array."""
+        projected = [self.project(document) for document in documents]
+        if self._list_adapter is None:
+            return orjson.dumps(projected)
+        return self._list_adapter.dump_json(projected)
+
+
+blog_serializer = ModelSerializer(BlogResponse)
+html_blog_serializer = ModelSerializer(BlogHTMLResponse)
+summary_serializer = ModelSerializer(BlogSummary)
+search_serializer = ModelSerializer(BlogSearchResult)
+user_serializer = ModelSerializer(UserResponse)
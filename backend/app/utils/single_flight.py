@@ -0,0 +1,70 @@
+from functools import partial
+from typing import Awaitable, Callable, Dict, Hashable, List, TypeVar
+import asyncio
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result.
+
+    The call runs as its own task and callers await it through
+    ``asyncio.shield``, so one caller being cancelled (its client went
+    away) doesn't cancel the call for the others. An exception is raised
+    in every caller. The key is forgotten as soon as the call finishes:
+    this deduplicates concurrent work, it is not a cache. Callers share
+    the result object, so they must copy it before changing it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self.failures = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        _flights.append(self)
+
+    def start(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> "asyncio.Task[T]":
+        """Return the task running for ``key``, starting ``call()`` if there is none."""
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = self._in_flight[key] = asyncio.get_running_loop().create_task(call())
+        self.calls += 1
+        task.add_done_callback(partial(self._finished, key))
+        return task
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Await ``call()``, or the identical call already in flight for ``key``."""
+        return await asyncio.shield(self.start(key, call))
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Also marks the exception retrieved when every caller was cancelled
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    async def cancel(self) -> None:
+        """Cancel calls still in flight, e.g. on shutdown before storage closes."""
+        tasks = list(self._in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+        }
+
+
+_flights: List[SingleFlight] = []
+
+
+def single_flight_stats() -> dict:
+    """Return call, coalesced and failure counters for every single-flight group."""
+    return {flight.name: flight.stats() for flight in _flights}
@@ -0,0 +1,50 @@
+import math
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Summary configurations
+EXCERPT_LENGTH = int(os.getenv("EXCERPT_LENGTH", "200"))
+WORDS_PER_MINUTE = int(os.getenv("WORDS_PER_MINUTE", "200"))
+
+# Markdown links and images keep their text; block markers and emphasis are dropped
+_LINK = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+_BLOCK_MARKER = re.compile(r"^[ \t]*(?:#{1,6}|>|[-*+]|\d+\.)[ \t]+", re.MULTILINE)
+_EMPHASIS = str.maketrans("", "", "*`~")
+
+
+def _plain_text(content: str) -> str:
+    text = _BLOCK_MARKER.sub("", content).translate(_EMPHASIS).replace("__", "")
+    return " ".join(text.split())
+
+
+def make_excerpt(content: str, length: int = EXCERPT_LENGTH) -> str:
+    """Return a plain-text teaser of at most ``length`` characters plus an ellipsis."""
+    if "[" in content:
+        content = _LINK.sub(r"\1", content)
+
+    # The remaining markup only shortens text, so clean a window rather than the whole post
+    window = length * 2
+    while True:
+        text = _plain_text(content[:window])
+        if len(text) > length or window >= len(content):
+            break
+        window *= 4
+    if len(text) <= length:
+        return text
+
+    # Cut at the last word boundary that fits
+    cut = text[:length + 1].rsplit(" ", 1)[0] or text[:length]
+    return cut.rstrip(",.;:!?-") + "…"
+
+
+def summarize(content: str) -> dict:
+    """Compute the fields stored next to ``content`` for summary listings."""
+    word_count = len(content.split())
+    return {
+        "excerpt": make_excerpt(content),
+        "word_count": word_count,
+        "reading_time": max(1, math.ceil(word_count / WORDS_PER_MINUTE)),
+    }
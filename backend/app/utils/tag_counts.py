@@ -0,0 +1,48 @@
+from typing import List
+import os
+from dotenv import load_dotenv
+
+from app.repositories import BlogRepository
+from app.utils.cache import LRUCache
+
+load_dotenv()
+
+# Tag count cache configurations
+TAG_CACHE_TTL = float(os.getenv("TAG_CACHE_TTL", "60"))
+
+tag_cache = LRUCache(maxsize=1, ttl=TAG_CACHE_TTL)
+
+# Bumped on every invalidation so reads that raced a write don't re-cache stale counts
+_generation = 0
+
+
+async def get_tag_counts(blogs: BlogRepository) -> List[dict]:
+    """Return ``{"tag", "count"}`` items, most used first.
+
+    Counts are read from the repository's counters at most once per
+    TAG_CACHE_TTL; writes made through this process drop the cached copy
+    right away, so only other instances' writes can be that stale.
+    """
+    counts = tag_cache.get("all")
+    if counts is None:
+        generation = _generation
+        stored = await blogs.tag_counts()
+        counts = sorted(
+            ({"tag": tag, "count": count} for tag, count in stored.items()),
+            key=lambda item: (-item["count"], item["tag"]),
+        )
+        if generation == _generation:
+            tag_cache.set("all", counts)
+    return counts
+
+
+def invalidate_tag_counts() -> None:
+    """Drop the cached counts after a write that changed tags."""
+    global _generation
+    _generation += 1
+    tag_cache.pop("all")
+
+
+def tag_cache_stats() -> dict:
+    """Return hit/miss counters for the tag count cache."""
+    return tag_cache.stats()
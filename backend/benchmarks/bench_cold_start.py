@@ -0,0 +1,106 @@
+"""Cold-start benchmark for the serverless entry point.
+
+Every sample runs in a fresh interpreter: it imports ``app.main``, then
+invokes the Mangum ``handler`` with an API Gateway (HTTP API) event, once
+cold and once warm. Import, first-request and warm-request times are
+reported as medians per mode, with and without SERVERLESS_MODE.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_cold_start --runs 10
+    python -m benchmarks.bench_cold_start --path /api/blogs/ --storage sqlite
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SAMPLE = r"""
+import json, sys, time
+started = time.perf_counter()
+import app.main as main
+imported = time.perf_counter()
+
+def event(path):
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"host": "benchmark", "user-agent": "bench_cold_start"},
+        "requestContext": {
+            "accountId": "benchmark",
+            "apiId": "benchmark",
+            "domainName": "benchmark",
+            "requestId": "benchmark",
+            "stage": "$default",
+            "http": {"method": "GET", "path": path, "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1", "userAgent": "bench_cold_start"},
+        },
+        "isBase64Encoded": False,
+    }
+
+response = main.handler(event(sys.argv[1]), {})
+first = time.perf_counter()
+main.handler(event(sys.argv[1]), {})
+warm = time.perf_counter()
+
+print(json.dumps({
+    "status": response["statusCode"],
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (first - imported) * 1000,
+    "warm_request_ms": (warm - first) * 1000,
+}))
+"""
+
+
+def sample(path: str, env: dict) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", SAMPLE, path],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def run_mode(serverless: bool, args, directory: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "SERVERLESS_MODE": "true" if serverless else "false",
+        "STORAGE_BACKEND": args.storage,
+        "SQLITE_PATH": os.path.join(directory, "cold_start.db"),
+        "LOG_LEVEL": "WARNING",
+    })
+    samples = [sample(args.path, env) for _ in range(args.runs)]
+    statuses = sorted({s["status"] for s in samples})
+    report = {"status": statuses}
+    for field in ("import_ms", "first_request_ms", "warm_request_ms", "process_ms"):
+        report[field] = round(statistics.median(s[field] for s in samples), 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/api/health")
+    parser.add_argument("--storage", choices=["memory", "sqlite", "mongo"], default="memory",
+                        help="mongo uses MONGO_URI from the environment")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = {
+            "path": args.path,
+            "storage": args.storage,
+            "runs": args.runs,
+            "serverless": run_mode(True, args, directory),
+            "default": run_mode(False, args, directory),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Measure response compression ratio and CPU time per encoding and level.
+
+Payloads are real response bodies: a single post and list pages serialized
+by the routes' serializers from the seeded in-memory repository. Every
+available encoding (gzip, deflate, and zstd when ``zstandard`` is
+installed) is timed at each level, in microseconds of CPU per body, next to
+the ratio it reaches. This is what the COMPRESSION_*_LEVEL defaults were
+picked from: past them, time grows much faster than the ratio.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_compression --iterations 200
+"""
+import argparse
+import asyncio
+import json
+import time
+import zlib
+
+from app.repositories.memory import InMemoryBlogRepository, InMemoryUserRepository
+from app.utils.compression import zstandard
+from app.utils.serialization import blog_serializer, summary_serializer
+from benchmarks.seed import seed
+
+LEVELS = {
+    "gzip": (1, 2, 4, 6, 9),
+    "deflate": (1, 2, 4, 6, 9),
+    "zstd": (1, 3, 6, 10, 19),
+}
+
+
+def compressor_for(encoding: str, level: int):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress
+    wbits = 31 if encoding == "gzip" else 15
+
+    def compress(body: bytes) -> bytes:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+        return compressor.compress(body) + compressor.flush()
+    return compress
+
+
+def measure(compress, body: bytes, iterations: int) -> dict:
+    compressed = compress(body)
+    start = time.thread_time()
+    for _ in range(iterations):
+        compress(body)
+    cpu = (time.thread_time() - start) / iterations
+    return {"ratio": round(len(body) / len(compressed), 2), "cpu_us": round(cpu * 1e6, 1)}
+
+
+async def payloads() -> dict:
+    users, blogs = InMemoryUserRepository(), InMemoryBlogRepository()
+    seeded = await seed(users, blogs, users=20, blogs=100)
+    usernames = {user["id"]: user["username"] for user in seeded}
+
+    full = await blogs.list(limit=100)
+    summaries = await blogs.list(limit=10, summary=True)
+    for blog in full + summaries:
+        blog["author_username"] = usernames[blog["author_id"]]
+    return {
+        "single_post": blog_serializer.dump(full[0]),
+        "page_10": blog_serializer.dump_many(full[:10]),
+        "page_100": blog_serializer.dump_many(full),
+        "summary_page_10": summary_serializer.dump_many(summaries),
+    }
+
+
+def run(args) -> dict:
+    encodings = ["gzip", "deflate"] + (["zstd"] if zstandard else [])
+    report = {"iterations": args.iterations, "zstd": zstandard is not None, "payloads": {}}
+    for name, body in asyncio.run(payloads()).items():
+        report["payloads"][name] = {
+            "bytes": len(body),
+            **{
+                encoding: {
+                    str(level): measure(compressor_for(encoding, level), body, args.iterations)
+                    for level in LEVELS[encoding]
+                }
+                for encoding in encodings
+            },
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Measure per-request overhead of the CORS middleware stack.
+
+Compares the previous stack (OptionsMiddleware + Starlette's CORSMiddleware +
+the ``add_cors_headers`` HTTP middleware) against the pure ASGI
+``app.middleware.CORSMiddleware``. Requests are driven straight through the
+ASGI interface so only middleware cost is measured.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse, Response
+
+from app.middleware import CORSMiddleware, CORSPolicy
+
+ORIGIN = "http://localhost:5173"
+ALLOW_METHODS = ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"]
+ALLOW_HEADERS = ["X-CSRF-Token", "X-Requested-With", "Accept", "Accept-Version",
+                 "Content-Length", "Content-MD5", "Content-Type", "Date",
+                 "X-Api-Version", "Authorization", "Origin"]
+LEGACY_HEADERS = {
+    "Access-Control-Allow-Origin": "https://qblog-nrzw.vercel.app",
+    "Access-Control-Allow-Methods": "GET,OPTIONS,PATCH,DELETE,POST,PUT",
+    "Access-Control-Allow-Headers": ", ".join(ALLOW_HEADERS),
+    "Access-Control-Allow-Credentials": "true",
+}
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return PlainTextResponse("pong")
+
+    return app
+
+
+def legacy_app() -> FastAPI:
+    """Rebuild the middleware chain app.main used before the pure ASGI layer."""
+    app = make_app()
+
+    class OptionsMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            if request.method == "OPTIONS":
+                response = Response(content="", status_code=200)
+                response.headers.update(LEGACY_HEADERS)
+                response.headers["Access-Control-Max-Age"] = "86400"
+                return response
+            return await call_next(request)
+
+    app.add_middleware(OptionsMiddleware)
+    app.add_middleware(
+        StarletteCORSMiddleware,
+        allow_origins=[ORIGIN],
+        allow_origin_regex=r"https://(.*\.)?vercel\.app",
+        allow_credentials=True,
+        allow_methods=ALLOW_METHODS,
+        allow_headers=ALLOW_HEADERS,
+        expose_headers=["Content-Length", "Content-Type"],
+        max_age=86400,
+    )
+
+    @app.middleware("http")
+    async def add_cors_headers(request, call_next):
+        response = await call_next(request)
+        response.headers.update(LEGACY_HEADERS)
+        return response
+
+    return app
+
+
+def current_app() -> FastAPI:
+    app = make_app()
+    policy = CORSPolicy(
+        allow_origins=[ORIGIN],
+        allow_origin_regex=r"https://(.*\.)?vercel\.app",
+        allow_credentials=True,
+        allow_methods=ALLOW_METHODS,
+        allow_headers=ALLOW_HEADERS,
+        expose_headers=["Content-Length", "Content-Type"],
+        max_age=86400,
+    )
+    app.add_middleware(CORSMiddleware, policy=policy)
+    return app
+
+
+async def drive(app, method: str, n: int) -> float:
+    """Send n requests through the ASGI app and return mean microseconds per request."""
+    headers = [(b"host", b"testserver"), (b"origin", ORIGIN.encode())]
+    if method == "OPTIONS":
+        headers.append((b"access-control-request-method", b"POST"))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": "/ping", "raw_path": b"/ping",
+        "root_path": "", "query_string": b"", "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+
+    never = asyncio.Event()
+
+    async def send(message):
+        pass
+
+    async def one_request():
+        delivered = False
+
+        async def receive():
+            nonlocal delivered
+            if delivered:
+                # Like a real server: block until the client disconnects
+                await never.wait()
+            delivered = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await app(dict(scope), receive, send)
+
+    # Warm up route matching and any lazily built state
+    for _ in range(200):
+        await one_request()
+
+    start = time.perf_counter()
+    for _ in range(n):
+        await one_request()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def run(n: int) -> dict:
+    results = {}
+    for name, factory in (("no_middleware", make_app), ("legacy", legacy_app), ("asgi", current_app)):
+        app = factory()
+        results[name] = {
+            "get_us": round(await drive(app, "GET", n), 2),
+            "preflight_us": round(await drive(app, "OPTIONS", n), 2),
+        }
+    base = results["no_middleware"]["get_us"]
+    for name in ("legacy", "asgi"):
+        results[name]["get_overhead_us"] = round(results[name]["get_us"] - base, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
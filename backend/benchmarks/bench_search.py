@@ -0,0 +1,131 @@
+"""Measure full-text search indexing, query latency and snapshot cost.
+
+Posts are generated with a Zipf-like vocabulary (a few very common words,
+a long tail of rare ones) so postings lists have realistic lengths, and
+are fed straight into ``app.utils.search.SearchIndex``. Queries are drawn
+from rare, mid-frequency and common words, alone and combined; timings
+are per query, in milliseconds.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_search --posts 200000 --queries 200
+"""
+import argparse
+import bisect
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+
+from app.utils.search import SearchIndex
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    words = []
+    seen = set()
+    while len(words) < size:
+        word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    weights = list(accumulate(1 / (rank + 1) for rank in range(size)))
+    return words, weights
+
+
+def make_posts(count: int, words, weights, rng: random.Random):
+    total = weights[-1]
+
+    def sample(n):
+        return " ".join(words[bisect.bisect_left(weights, rng.random() * total)] for _ in range(n))
+
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        created_at = start + timedelta(seconds=i)
+        yield {
+            "id": f"{0xb000000 + i:024x}",
+            "title": sample(rng.randint(3, 8)),
+            "content": sample(rng.randint(100, 600)),
+            "updated_at": created_at,
+        }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def time_queries(index: SearchIndex, queries, limit: int) -> dict:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, limit)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(percentile(timings, 0.5), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+    }
+
+
+def run(args) -> dict:
+    rng = random.Random(args.seed)
+    words, weights = make_vocabulary(args.vocabulary, rng)
+    index = SearchIndex()
+
+    # Generated in chunks so only indexing is timed, without holding every post in memory
+    build_seconds = 0.0
+    posts = make_posts(args.posts, words, weights, rng)
+    while True:
+        chunk = list(islice(posts, 10000))
+        if not chunk:
+            break
+        start = time.perf_counter()
+        for post in chunk:
+            index.add(post)
+        build_seconds += time.perf_counter() - start
+
+    # Ranks in the Zipf vocabulary: the most common words appear in most posts
+    common, middle, rare = words[5:50], words[500:2000], words[20000:args.vocabulary]
+    groups = {
+        "rare_word": [rng.choice(rare) for _ in range(args.queries)],
+        "mid_word": [rng.choice(middle) for _ in range(args.queries)],
+        "common_word": [rng.choice(common) for _ in range(args.queries)],
+        "three_mixed_words": [
+            f"{rng.choice(rare)} {rng.choice(middle)} {rng.choice(common)}" for _ in range(args.queries)
+        ],
+    }
+
+    start = time.perf_counter()
+    snapshot = index.dump()
+    dump_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    SearchIndex().load(snapshot)
+    load_seconds = time.perf_counter() - start
+
+    report = {
+        "posts": args.posts,
+        "index": index.stats(),
+        "build_seconds": round(build_seconds, 2),
+        "posts_per_second": round(args.posts / build_seconds),
+        "snapshot_mb": round(len(snapshot) / 1e6, 1),
+        "snapshot_dump_seconds": round(dump_seconds, 2),
+        "snapshot_load_seconds": round(load_seconds, 2),
+        "queries": {name: time_queries(index, queries, args.limit) for name, queries in groups.items()},
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure serialization cost of a blog list page.
+
+Compares FastAPI's ``response_model`` path (validate every document against
+``List[BlogResponse]``, dump it to Python objects, then ``json.dumps``)
+with ``app.utils.serialization.blog_serializer``, which projects the trusted
+documents and dumps them in one go. Pages come from the seeded in-memory
+repository, and both paths are checked to produce identical bytes.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_serialization --iterations 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.blog import BlogResponse
+from app.repositories.memory import InMemoryBlogRepository, InMemoryUserRepository
+from app.utils.serialization import blog_serializer, orjson
+from benchmarks.seed import seed
+
+RESPONSE_FIELD = create_response_field("Response_get_blogs", List[BlogResponse], mode="serialization")
+
+
+async def response_model_path(page: List[dict]) -> bytes:
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=page)
+    return JSONResponse(content).body
+
+
+async def serializer_path(page: List[dict]) -> bytes:
+    return blog_serializer.dump_many(page)
+
+
+async def measure(path, page: List[dict], iterations: int) -> float:
+    """Return the mean time per page in microseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await path(page)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def run(args) -> dict:
+    users, blogs = InMemoryUserRepository(), InMemoryBlogRepository()
+    seeded = await seed(users, blogs, users=20, blogs=max(args.limits))
+    usernames = {user["id"]: user["username"] for user in seeded}
+
+    report = {"iterations": args.iterations, "orjson": orjson is not None, "pages": []}
+    for limit in args.limits:
+        page = await blogs.list(limit=limit)
+        for blog in page:
+            blog["author_username"] = usernames[blog["author_id"]]
+
+        expected = await response_model_path(page)
+        if await serializer_path(page) != expected:
+            raise SystemExit(f"Serializer output differs from response_model at limit={limit}")
+
+        baseline = await measure(response_model_path, page, args.iterations)
+        fast = await measure(serializer_path, page, args.iterations)
+        report["pages"].append({
+            "limit": limit,
+            "bytes": len(expected),
+            "response_model_us": round(baseline, 1),
+            "serializer_us": round(fast, 1),
+            "speedup": round(baseline / fast, 2),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[10, 100])
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
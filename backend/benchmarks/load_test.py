@@ -0,0 +1,265 @@
+"""Reproducible in-process load test for the QBlog API.
+
+Starts ``app.main:app`` in-process on top of the in-memory (or a
+throwaway SQLite) storage backend, seeds it deterministically and drives a weighted mix of
+requests through an async HTTP client. Throughput and p50/p95/p99 latency
+per operation are printed (or written) as JSON so runs can be compared
+across commits.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --users 200 --blogs 5000 --requests 5000 --concurrency 32
+    python -m benchmarks.load_test --mix list=1 --output list.json
+    python -m benchmarks.load_test --storage sqlite
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+# Keep per-request logging out of the measurements and the JSON output
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Every virtual user shares one client address, so the per-IP login limit would
+# turn most logins into 429s; the limiter can still be measured by setting it
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+
+from benchmarks.seed import BENCHMARK_PASSWORD, seed
+
+DEFAULT_MIX = "list=35,deep_skip=5,deep_cursor=5,tag=15,single=30,login=2,create=4,update=4"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name}', expected one of {sorted(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Workload:
+    """Holds seeded fixtures and builds requests for each operation."""
+
+    def __init__(self, users: List[dict], blog_ids: List[str], blog_count: int, rng: random.Random):
+        from app.utils.auth import create_access_token
+        from app.utils.pagination import encode_cursor
+        from benchmarks.seed import TAGS
+        from datetime import datetime, timedelta
+
+        self.rng = rng
+        self.users = users
+        self.blog_ids = blog_ids
+        self.tags = TAGS
+        self.tokens = {u["id"]: create_access_token({"sub": u["id"]}) for u in users}
+        self.own_blogs: Dict[str, List[str]] = {}
+
+        # Cursors pointing deep into the listing, matching the seed layout
+        start = datetime(2024, 1, 1)
+        self.deep_positions = [blog_count // 2, max(0, blog_count - 20)]
+        self.deep_cursors = []
+        for position in self.deep_positions:
+            index = blog_count - 1 - position
+            self.deep_cursors.append(encode_cursor(
+                start + timedelta(seconds=index * 37),
+                f"{0xb000000 + index:024x}",
+            ))
+
+    def auth(self, user: dict) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user['id']]}"}
+
+    async def list(self, client):
+        return await client.get("/api/blogs/", params={"skip": self.rng.randrange(0, 50), "limit": 10})
+
+    async def deep_skip(self, client):
+        return await client.get("/api/blogs/", params={"skip": self.rng.choice(self.deep_positions), "limit": 10})
+
+    async def deep_cursor(self, client):
+        return await client.get("/api/blogs/", params={"cursor": self.rng.choice(self.deep_cursors), "limit": 10})
+
+    async def tag(self, client):
+        return await client.get("/api/blogs/", params={"tag": self.rng.choice(self.tags), "limit": 10})
+
+    async def single(self, client):
+        return await client.get(f"/api/blogs/{self.rng.choice(self.blog_ids)}")
+
+    async def login(self, client):
+        user = self.rng.choice(self.users)
+        return await client.post("/api/auth/login", data={"username": user["email"], "password": BENCHMARK_PASSWORD})
+
+    async def create(self, client):
+        user = self.rng.choice(self.users)
+        response = await client.post("/api/blogs/", headers=self.auth(user), json={
+            "title": f"Load test post {self.rng.randrange(10**9)}",
+            "content": "Generated by the load test. " * self.rng.randint(5, 50),
+            "tags": self.rng.sample(self.tags, 2),
+        })
+        if response.status_code == 201:
+            self.own_blogs.setdefault(user["id"], []).append(response.json()["id"])
+        return response
+
+    async def update(self, client):
+        if not self.own_blogs:
+            return await self.create(client)
+        user_id = self.rng.choice(sorted(self.own_blogs))
+        user = next(u for u in self.users if u["id"] == user_id)
+        blog_id = self.rng.choice(self.own_blogs[user_id])
+        return await client.put(f"/api/blogs/{blog_id}", headers=self.auth(user), json={
+            "title": f"Updated load test post {self.rng.randrange(10**9)}",
+        })
+
+
+OPERATIONS = {"list", "deep_skip", "deep_cursor", "tag", "single", "login", "create", "update"}
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def create_repositories(storage: str, directory: str):
+    """Build empty repositories for the chosen backend."""
+    if storage == "sqlite":
+        from app.repositories.sqlite import SQLiteBlogRepository, SQLiteStorage, SQLiteUserRepository
+        sqlite_storage = SQLiteStorage(os.path.join(directory, "benchmark.db"))
+        return SQLiteUserRepository(sqlite_storage), SQLiteBlogRepository(sqlite_storage), sqlite_storage
+
+    from app.repositories.memory import InMemoryBlogRepository, InMemoryUserRepository
+    return InMemoryUserRepository(), InMemoryBlogRepository(), None
+
+
+async def run(args) -> dict:
+    # Import-time diagnostics must not end up in the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        from app.main import app
+        from app.repositories import set_repositories
+        from app.utils.auth import shutdown_password_hashing
+
+    with tempfile.TemporaryDirectory() as directory:
+        user_repository, blog_repository, sqlite_storage = create_repositories(args.storage, directory)
+        set_repositories(user_repository, blog_repository)
+        try:
+            return await measure(app, args, user_repository, blog_repository)
+        finally:
+            shutdown_password_hashing()
+            if sqlite_storage is not None:
+                await sqlite_storage.close()
+
+
+async def measure(app, args, user_repository, blog_repository) -> dict:
+    users = await seed(user_repository, blog_repository, args.users, args.blogs, args.seed)
+    blog_ids = [f"{0xb000000 + i:024x}" for i in range(args.blogs)]
+
+    rng = random.Random(args.seed)
+    workload = Workload(users, blog_ids, args.blogs, rng)
+    mix = parse_mix(args.mix)
+    names = list(mix)
+    schedule = rng.choices(names, weights=[mix[n] for n in names], k=args.requests)
+
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    # Rejections by the rate limiter are not failures of the endpoint itself
+    rate_limited: Dict[str, int] = {name: 0 for name in names}
+    next_index = 0
+
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        # Warm up routing, caches of the import path and the executor
+        for name in names:
+            await getattr(workload, name)(client)
+
+        async def worker():
+            nonlocal next_index
+            while next_index < len(schedule):
+                name = schedule[next_index]
+                next_index += 1
+                start = time.perf_counter()
+                response = await getattr(workload, name)(client)
+                latencies[name].append(time.perf_counter() - start)
+                if response.status_code == 429:
+                    rate_limited[name] += 1
+                elif response.status_code >= 400:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        values = sorted(latencies[name])
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "rate_limited": rate_limited[name],
+            "throughput_rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p95_ms": round(percentile(values, 95) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+        }
+
+    everything = sorted(v for values in latencies.values() for v in values)
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "users": args.users,
+            "blogs": args.blogs,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "storage": args.storage,
+            "mix": mix,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(everything) / elapsed, 1),
+        "p50_ms": round(percentile(everything, 50) * 1000, 3),
+        "p95_ms": round(percentile(everything, 95) * 1000, 3),
+        "p99_ms": round(percentile(everything, 99) * 1000, 3),
+        "endpoints": endpoints,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--blogs", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated operation=weight pairs")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
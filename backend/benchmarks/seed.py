@@ -0,0 +1,58 @@
+"""Deterministic data generator for the benchmarks."""
+from datetime import datetime, timedelta
+from typing import List
+import random
+
+BENCHMARK_PASSWORD = "benchmark-password"
+TAGS = ["python", "fastapi", "mongodb", "react", "devops", "testing", "design", "career", "security", "data"]
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat"
+).split()
+
+
+def _paragraphs(rng: random.Random, count: int) -> str:
+    return "\n\n".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))
+        for _ in range(count)
+    )
+
+
+async def seed(user_repository, blog_repository, users: int, blogs: int, seed_value: int = 42) -> List[dict]:
+    """Insert users and blogs generated from seed_value; return the users.
+
+    Every user shares BENCHMARK_PASSWORD, hashed once, so seeding stays fast.
+    """
+    from app.utils.auth import get_password_hash
+
+    rng = random.Random(seed_value)
+    hashed_password = get_password_hash(BENCHMARK_PASSWORD)
+    start = datetime(2024, 1, 1)
+
+    seeded_users = []
+    for i in range(users):
+        user = {
+            "id": f"{i + 1:024x}",
+            "username": f"bench_user_{i}",
+            "email": f"bench_user_{i}@example.com",
+            "hashed_password": hashed_password,
+            "created_at": start,
+        }
+        await user_repository.insert(user)
+        seeded_users.append({"id": user["id"], "username": user["username"], "email": user["email"]})
+
+    for i in range(blogs):
+        author = seeded_users[rng.randrange(users)]
+        created_at = start + timedelta(seconds=i * 37)
+        await blog_repository.insert({
+            "id": f"{0xb000000 + i:024x}",
+            "title": f"Benchmark post {i}: {' '.join(rng.choice(WORDS) for _ in range(4))}",
+            "content": _paragraphs(rng, rng.randint(2, 8)),
+            "tags": rng.sample(TAGS, rng.randint(1, 3)),
+            "author_id": author["id"],
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+
+    return seeded_users
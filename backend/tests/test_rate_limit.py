@@ -0,0 +1,41 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.utils import rate_limit
+from app.utils.rate_limit import LocalBucketStore, RateLimit, enforce_rate_limit
+
+
+def make_request(ip: str) -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": [], "client": (ip, 1234)})
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = LocalBucketStore()
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(rate_limit.RATE_LIMITS, "login", RateLimit(rate=1 / 600, burst=3))
+    monkeypatch.setattr(rate_limit, "_store", store)
+    return store
+
+
+def test_ip_rejection_does_not_drain_account(store):
+    attacker = make_request("10.0.0.1")
+    for i in range(3):
+        enforce_rate_limit("login", attacker, f"other{i}@example.com")
+    for _ in range(20):
+        with pytest.raises(HTTPException) as rejected:
+            enforce_rate_limit("login", attacker, "victim@example.com")
+        assert rejected.value.status_code == 429
+
+    # The victim still has their whole burst from their own address
+    victim = make_request("10.0.0.2")
+    for _ in range(3):
+        enforce_rate_limit("login", victim, "victim@example.com")
+
+
+def test_account_limit_applies_across_ips(store):
+    for i in range(3):
+        enforce_rate_limit("login", make_request(f"10.0.1.{i}"), "user@example.com")
+    with pytest.raises(HTTPException):
+        enforce_rate_limit("login", make_request("10.0.1.99"), "user@example.com")
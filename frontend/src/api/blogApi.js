@@ -202,7 +202,7 @@ const blogApi = {
           console.log(`Found user ID: ${userId} for username: ${username}`);
           
           const response = await api.get(`/api/blogs`, { 
-            params: { author_id: userId } 
+            params: { author_id: userId, view: 'summary' } 
           });
           return response.data;
         } else {
@@ -3,7 +3,7 @@ import { Link as RouterLink } from 'react-router-dom';
 import { format } from 'date-fns';
 
 const BlogCard = ({ blog }) => {
-  const { id, title, content, tags, author_username, created_at } = blog;
+  const { id, title, content, excerpt, tags, author_username, created_at } = blog;
   
   // Format date
   const formattedDate = format(new Date(created_at), 'MMM dd, yyyy');
@@ -12,10 +12,11 @@ const BlogCard = ({ blog }) => {
   const colorOptions = ['#FDEFE9', '#E2F0FE', '#ECFDF3', '#F2F0FF', '#FFF8E8', '#FCF0F4'];
   const randomColor = colorOptions[Math.floor(Math.random() * colorOptions.length)];
   
-  // Truncate content for preview
-  const truncatedContent = content.length > 120 
-    ? `${content.substring(0, 120)}...` 
-    : content;
+  // Truncate content for preview (summary listings send an excerpt instead)
+  const preview = excerpt ?? content ?? '';
+  const truncatedContent = preview.length > 120 
+    ? `${preview.substring(0, 120)}...` 
+    : preview;
 
   // Get first letter of author name for avatar
   const avatarInitial = author_username ? author_username[0].toUpperCase() : '?';
@@ -38,7 +38,7 @@ const HomePage = () => {
       try {
         setLoading(true);
         const skip = (currentPage - 1) * pageSize;
-        const data = await blogApi.getBlogs({ skip, limit: pageSize });
+        const data = await blogApi.getBlogs({ skip, limit: pageSize, view: 'summary' });
         setBlogs(data);
         setError(null);
       } catch (error) {
@@ -52,10 +52,11 @@ const HomePage = () => {
     fetchBlogs();
   }, [currentPage]);
 
+  // Summary rows carry an excerpt instead of the full content
   const filteredBlogs = blogs.filter(
     (blog) =>
       blog.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      blog.content.toLowerCase().includes(searchTerm.toLowerCase()) ||
+      (blog.excerpt ?? blog.content ?? '').toLowerCase().includes(searchTerm.toLowerCase()) ||
       blog.tags.some((tag) => tag.toLowerCase().includes(searchTerm.toLowerCase()))
   );
 